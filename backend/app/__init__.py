@@ -4,8 +4,9 @@ from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_cors import CORS
 from .config import Config
+from .replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 
@@ -21,6 +22,45 @@ def create_app():
     jwt.init_app(app)
     migrate.init_app(app, db)
 
+    from .replicas import init_replicas
+    init_replicas(app)
+
+    from .metrics import init_metrics
+    init_metrics(app)
+
+    from .serialization import init_serialization
+    init_serialization(app)
+
+    from .storage import create_storage
+    app.extensions['storage'] = create_storage(app)
+
+    from .services import PresignedUrlCache, UserCache, load_jwt_user
+    app.extensions['presigned_url_cache'] = PresignedUrlCache(app.config['PRESIGNED_URL_CACHE_SIZE'])
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    jwt.user_lookup_loader(load_jwt_user)
+
+    from .passwords import create_password_hasher
+    app.extensions['password_hasher'] = create_password_hasher(app)
+
+    from .ratelimit import create_rate_limiter
+    app.extensions['rate_limiter'] = create_rate_limiter(app)
+
+    from .email_queue import EmailWorker
+    app.extensions['email_worker'] = EmailWorker(app)
+
+    from .garbage import GarbageCollector
+    app.extensions['garbage_collector'] = GarbageCollector(app)
+
+    from .verification import VerificationSweeper
+    app.extensions['verification_sweeper'] = VerificationSweeper(app)
+
+    from .commands import email_worker_command, collect_garbage_command, sweep_verifications_command, \
+        reconcile_usage_command
+    app.cli.add_command(email_worker_command)
+    app.cli.add_command(collect_garbage_command)
+    app.cli.add_command(sweep_verifications_command)
+    app.cli.add_command(reconcile_usage_command)
+
     from .routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
 
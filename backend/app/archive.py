@@ -0,0 +1,101 @@
+# backend/app/archive.py
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+
+
+class _ChunkWriter:
+    # Unseekable sink for ZipFile: collects what it writes until the generator drains it.
+    # Without seek/tell, ZipFile writes data descriptors instead of patching headers.
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _archive_names(files):
+    # Shared files can have the same name as owned ones; keep every entry addressable
+    seen = set()
+    for file_id, filename, _, _, uploaded in files:
+        name = posixpath.basename(filename.replace('\\', '/')) or str(file_id)
+        if name in seen:
+            stem, dot, ext = name.rpartition('.')
+            name = f"{stem} ({file_id}).{ext}" if dot and stem else f"{name} ({file_id})"
+        seen.add(name)
+        yield name
+
+
+def _prefetch(app, storage, key, chunk_size):
+    # Runs on the prefetch thread, which needs its own app context for the storage client
+    with app.app_context():
+        return _open_with_first_chunk(storage, key, chunk_size)
+
+
+def _open_with_first_chunk(storage, key, chunk_size):
+    stream = storage.open(key)
+    return stream, stream.read(chunk_size)
+
+
+def _close_prefetched(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
+
+
+def stream_zip(storage, files, chunk_size, prefetch=False):
+    # files is a list of (id, filename, storage key, size, upload time). Entries are stored
+    # uncompressed in ZIP64 form and copied chunk by chunk, so memory stays at a few chunks
+    # however large the archive. With prefetch, the next object is opened and its first
+    # chunk fetched while the current one streams, hiding per-object latency.
+    writer = _ChunkWriter()
+    archive = zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED, allowZip64=True)
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch and len(files) > 1 else None
+    app = current_app._get_current_object()
+    try:
+        pending = None
+        for index, (entry, name) in enumerate(zip(files, _archive_names(files))):
+            _, _, key, size, uploaded = entry
+            if pending is not None:
+                stream, chunk = pending.result()
+            else:
+                stream, chunk = _open_with_first_chunk(storage, key, chunk_size)
+            pending = None
+            if executor is not None and index + 1 < len(files):
+                pending = executor.submit(_prefetch, app, storage, files[index + 1][2], chunk_size)
+
+            info = zipfile.ZipInfo(name, date_time=(uploaded or datetime(1980, 1, 1)).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            if size is not None:
+                info.file_size = size
+            try:
+                with archive.open(info, 'w', force_zip64=True) as out:
+                    while chunk:
+                        out.write(chunk)
+                        yield writer.drain()
+                        chunk = stream.read(chunk_size)
+            finally:
+                stream.close()
+            yield writer.drain()
+        archive.close()
+        yield writer.drain()
+    except Exception:
+        # Headers are already sent; the client sees a truncated archive
+        app.logger.error("Error streaming zip archive", exc_info=True)
+        raise
+    finally:
+        if executor is not None:
+            if pending is not None and not pending.cancel():
+                # The next object is open or still opening; close it once it is
+                pending.add_done_callback(_close_prefetched)
+            executor.shutdown(wait=False, cancel_futures=True)
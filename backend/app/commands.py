@@ -0,0 +1,56 @@
+# backend/app/commands.py
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .garbage import collect_garbage
+from .verification import sweep_expired_verifications
+from .usage import reconcile_storage_usage, repair_file_sizes
+
+
+@click.command('email-worker')
+@with_appcontext
+def email_worker_command():
+    """Deliver queued emails until interrupted."""
+    click.echo('Email worker started')
+    current_app.extensions['email_worker'].run_forever()
+
+
+@click.command('collect-garbage')
+@click.option('--loop', is_flag=True, help='Keep collecting until interrupted.')
+@with_appcontext
+def collect_garbage_command(loop):
+    """Delete stored objects whose files have been deleted."""
+    if loop:
+        click.echo('Garbage collector started')
+        current_app.extensions['garbage_collector'].run_forever()
+        return
+    report = collect_garbage()
+    click.echo(f"Reclaimed {report['reclaimed']} objects, skipped {report['skipped']} still in use, "
+               f"{report['failed']} failed")
+
+
+@click.command('sweep-verifications')
+@click.option('--loop', is_flag=True, help='Keep sweeping every VERIFICATION_SWEEP_INTERVAL seconds.')
+@with_appcontext
+def sweep_verifications_command(loop):
+    """Delete expired email verification records."""
+    if loop:
+        click.echo('Verification sweeper started')
+        current_app.extensions['verification_sweeper'].run_forever()
+        return
+    report = sweep_expired_verifications()
+    click.echo(f"Swept {report['swept']} expired verifications in {report['batches']} batches "
+               f"({report['duration']:.3f}s)")
+
+
+@click.command('reconcile-usage')
+@click.option('--batch-size', type=int, help='Users per batch (default USAGE_RECONCILE_BATCH_SIZE).')
+@click.option('--repair-sizes', is_flag=True, help='First fill in file sizes recorded as 0.')
+@with_appcontext
+def reconcile_usage_command(batch_size, repair_sizes):
+    """Recompute per-user storage usage from file sizes."""
+    batch_size = batch_size or current_app.config['USAGE_RECONCILE_BATCH_SIZE']
+    if repair_sizes:
+        click.echo(f"Repaired the size of {repair_file_sizes(batch_size)} files")
+    checked, repaired = reconcile_storage_usage(batch_size)
+    click.echo(f"Checked {checked} users, repaired {repaired}")
@@ -1,10 +1,30 @@
 
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
 
 load_dotenv()
 
 
+def _engine_options():
+    # Pool settings apply to the primary and every replica. DB_POOL_CLASS=null opens a
+    # connection per checkout, which suits PgBouncer in transaction pooling mode.
+    options = {'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'}
+    if os.environ.get('DB_POOL_CLASS', '').lower() == 'null':
+        options['poolclass'] = NullPool
+    else:
+        for name, option, cast in (
+            ('DB_POOL_SIZE', 'pool_size', int),
+            ('DB_MAX_OVERFLOW', 'max_overflow', int),
+            ('DB_POOL_TIMEOUT', 'pool_timeout', float),
+        ):
+            if os.environ.get(name):
+                options[option] = cast(os.environ[name])
+    if os.environ.get('DB_POOL_RECYCLE'):
+        options['pool_recycle'] = int(os.environ['DB_POOL_RECYCLE'])
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     if not SECRET_KEY:
@@ -15,15 +35,128 @@ class Config:
         raise ValueError("No DATABASE_URL provided in environment variables.")
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options()
+
+    # Optional comma-separated read replica URLs. Read-only routes query a replica unless the
+    # user wrote in the last REPLICA_PIN_SECONDS; writes always go to DATABASE_URL.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f"replica_{i}": url for i, url in enumerate(DATABASE_REPLICA_URLS)}
+    REPLICA_PIN_SECONDS = float(os.environ.get('REPLICA_PIN_SECONDS', 5))
 
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     if not JWT_SECRET_KEY:
         raise ValueError("No JWT_SECRET_KEY provided in environment variables.")
 
+    # 's3' or 'local'; the local backend keeps files under LOCAL_STORAGE_PATH
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 's3')
+    LOCAL_STORAGE_PATH = os.environ.get('LOCAL_STORAGE_PATH', 'storage')
+    LOCAL_STORAGE_CHUNK_SIZE = int(os.environ.get('LOCAL_STORAGE_CHUNK_SIZE', 1024 * 1024))
+    # nginx internal location that maps to LOCAL_STORAGE_PATH, e.g. /protected-files
+    LOCAL_STORAGE_ACCEL_REDIRECT = os.environ.get('LOCAL_STORAGE_ACCEL_REDIRECT')
+
     AWS_S3_BUCKET = os.environ.get('AWS_S3_BUCKET')
     AWS_ACCESS_KEY = os.environ.get('AWS_ACCESS_KEY')
     AWS_SECRET_KEY = os.environ.get('AWS_SECRET_KEY')
     AWS_REGION = os.environ.get('AWS_REGION', 'us-east-2')
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+
+    # S3 client connection pool, reused for the lifetime of each worker process
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 50))
+    S3_TCP_KEEPALIVE = os.environ.get('S3_TCP_KEEPALIVE', 'true').lower() == 'true'
+    S3_RETRY_MODE = os.environ.get('S3_RETRY_MODE', 'standard')
+    S3_MAX_ATTEMPTS = int(os.environ.get('S3_MAX_ATTEMPTS', 3))
+
+    # Presigned download URLs are reused while more than the given fraction of their lifetime remains
+    PRESIGNED_URL_EXPIRATION = int(os.environ.get('PRESIGNED_URL_EXPIRATION', 3600))
+    PRESIGNED_URL_MIN_REMAINING = float(os.environ.get('PRESIGNED_URL_MIN_REMAINING', 0.5))
+    PRESIGNED_URL_CACHE_SIZE = int(os.environ.get('PRESIGNED_URL_CACHE_SIZE', 10000))
+    DOWNLOAD_BATCH_MAX = int(os.environ.get('DOWNLOAD_BATCH_MAX', 100))
+
+    # POST /download/zip streams stored objects into an archive in chunks of ZIP_CHUNK_SIZE bytes
+    ZIP_MAX_FILES = int(os.environ.get('ZIP_MAX_FILES', 1000))
+    ZIP_CHUNK_SIZE = int(os.environ.get('ZIP_CHUNK_SIZE', 1024 * 1024))
+    ZIP_PREFETCH = os.environ.get('ZIP_PREFETCH', 'true').lower() == 'true'
+
+    # Prometheus metrics at /metrics (optionally behind a bearer token) and slow-request logging
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN')
+    SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 1.0))
+    SLOW_REQUEST_MAX_QUERIES = int(os.environ.get('SLOW_REQUEST_MAX_QUERIES', 100))
+
+    # JSON responses are serialized with orjson when it is installed ('default' for the standard
+    # library) and gzip- or brotli-encoded from COMPRESS_MIN_SIZE bytes when the client accepts it
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'orjson')
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+
+    # Per-process cache of the users behind JWT identities
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+
+    # Bytes each user may store unless user.storage_quota overrides it; 0 means unlimited
+    DEFAULT_STORAGE_QUOTA = int(os.environ.get('DEFAULT_STORAGE_QUOTA', 0))
+    USAGE_RECONCILE_BATCH_SIZE = int(os.environ.get('USAGE_RECONCILE_BATCH_SIZE', 1000))
+
+    # Keyset-paginated /files/owned and /files/shared listings
+    FILES_PAGE_SIZE = int(os.environ.get('FILES_PAGE_SIZE', 50))
+    FILES_PAGE_MAX = int(os.environ.get('FILES_PAGE_MAX', 200))
+    # Ranked /files/search results are paged by offset, up to this many rows deep
+    SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 1000))
+
+    # Stored objects that lose their last reference are deleted in the background
+    GC_WORKER_ENABLED = os.environ.get('GC_WORKER_ENABLED', 'true').lower() == 'true'
+    GC_BATCH_SIZE = int(os.environ.get('GC_BATCH_SIZE', 1000))
+    GC_GRACE_PERIOD = int(os.environ.get('GC_GRACE_PERIOD', 300))
+    GC_POLL_INTERVAL = float(os.environ.get('GC_POLL_INTERVAL', 60))
+    GC_RETRY_BACKOFF = int(os.environ.get('GC_RETRY_BACKOFF', 60))
+    BULK_DELETE_MAX = int(os.environ.get('BULK_DELETE_MAX', 1000))
+
+    # Password hashes are computed in a process pool; once PASSWORD_HASH_QUEUE_MAX hashes are
+    # running or waiting, login and registration answer 503. Workers 0 hashes in the request thread.
+    # Stored hashes made with another method are upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(os.cpu_count() or 1, 4)))
+    PASSWORD_HASH_QUEUE_MAX = int(os.environ.get('PASSWORD_HASH_QUEUE_MAX', 4 * max(PASSWORD_HASH_WORKERS, 1)))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Token-bucket limits ("count/second|minute|hour|day") for the auth and email endpoints.
+    # memory:// keeps buckets per process; a redis:// URL shares them across processes.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORAGE_URL = os.environ.get('RATE_LIMIT_STORAGE_URL', 'memory://')
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+    RATE_LIMITS = {
+        'login-ip': os.environ.get('RATE_LIMIT_LOGIN_IP', '20/minute'),
+        'login-account': os.environ.get('RATE_LIMIT_LOGIN_ACCOUNT', '10/minute'),
+        'register-ip': os.environ.get('RATE_LIMIT_REGISTER_IP', '10/hour'),
+        'register-email': os.environ.get('RATE_LIMIT_REGISTER_EMAIL', '5/hour'),
+        'verify-ip': os.environ.get('RATE_LIMIT_VERIFY_IP', '30/minute'),
+        'verify-session': os.environ.get('RATE_LIMIT_VERIFY_SESSION', '5/minute'),
+        'resend-ip': os.environ.get('RATE_LIMIT_RESEND_IP', '10/hour'),
+        'resend-session': os.environ.get('RATE_LIMIT_RESEND_SESSION', '1/minute'),
+    }
+
+    # Expired registration attempts are deleted periodically in bounded batches
+    VERIFICATION_SWEEP_ENABLED = os.environ.get('VERIFICATION_SWEEP_ENABLED', 'true').lower() == 'true'
+    VERIFICATION_SWEEP_INTERVAL = float(os.environ.get('VERIFICATION_SWEEP_INTERVAL', 600))
+    VERIFICATION_SWEEP_BATCH_SIZE = int(os.environ.get('VERIFICATION_SWEEP_BATCH_SIZE', 500))
+
+    # Upper bound on file x recipient pairs in one bulk share/unshare request
+    BULK_SHARE_MAX = int(os.environ.get('BULK_SHARE_MAX', 10000))
+    # Upper bound on member_emails when creating a group
+    GROUP_MAX_MEMBERS = int(os.environ.get('GROUP_MAX_MEMBERS', 1000))
+
+    # Direct-to-S3 uploads: files at or above the threshold use presigned multipart parts
+    DIRECT_UPLOAD_EXPIRATION = int(os.environ.get('DIRECT_UPLOAD_EXPIRATION', 3600))
+    DIRECT_UPLOAD_MAX_SIZE = int(os.environ.get('DIRECT_UPLOAD_MAX_SIZE', 5 * 1024 ** 4))
+    MULTIPART_THRESHOLD = int(os.environ.get('MULTIPART_THRESHOLD', 100 * 1024 ** 2))
+    MULTIPART_PART_SIZE = int(os.environ.get('MULTIPART_PART_SIZE', 16 * 1024 ** 2))
+
+    # Server-side multipart transfers (the /upload fallback); concurrency is capped so that
+    # in-flight parts never exceed the memory ceiling
+    S3_TRANSFER_MAX_CONCURRENCY = int(os.environ.get('S3_TRANSFER_MAX_CONCURRENCY', 8))
+    S3_TRANSFER_MAX_MEMORY = int(os.environ.get('S3_TRANSFER_MAX_MEMORY', 256 * 1024 ** 2))
 
     SMTP_HOST = os.environ.get('SMTP_HOST')
     if not SMTP_HOST:
@@ -42,3 +175,14 @@ class Config:
     EMAIL_SENDER = os.environ.get('EMAIL_SENDER')
     if not EMAIL_SENDER:
         raise ValueError("No EMAIL_SENDER provided in environment variables.")
+
+    SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+    # Close the worker's SMTP connection after this many idle seconds
+    SMTP_IDLE_TIMEOUT = int(os.environ.get('SMTP_IDLE_TIMEOUT', 60))
+
+    # Outbound emails are queued in the database and delivered by a background worker
+    EMAIL_WORKER_ENABLED = os.environ.get('EMAIL_WORKER_ENABLED', 'true').lower() == 'true'
+    EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 20))
+    EMAIL_POLL_INTERVAL = float(os.environ.get('EMAIL_POLL_INTERVAL', 5))
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RETRY_BACKOFF = int(os.environ.get('EMAIL_RETRY_BACKOFF', 30))
@@ -0,0 +1,96 @@
+# backend/app/email_queue.py
+import smtplib
+import time
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+from . import db
+from .metrics import timed_call, smtp_send_duration
+from .models import OutboundEmail
+from .workers import BackgroundWorker
+
+
+class EmailWorker(BackgroundWorker):
+    # Delivers queued OutboundEmail rows over a single authenticated SMTP
+    # connection that is kept open between batches.
+    name = 'email-worker'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._smtp = None
+        self._smtp_last_used = 0.0
+
+    def poll_interval(self):
+        return self.app.config['EMAIL_POLL_INTERVAL']
+
+    def on_idle(self):
+        if self._smtp and time.monotonic() - self._smtp_last_used > self.app.config['SMTP_IDLE_TIMEOUT']:
+            self._disconnect()
+
+    def run_once(self):
+        config = self.app.config
+        now = datetime.now(timezone.utc)
+        # SKIP LOCKED lets several worker processes drain the queue without
+        # sending the same message twice (ignored on SQLite).
+        batch = OutboundEmail.query.filter(
+            OutboundEmail.status == 'pending',
+            OutboundEmail.next_attempt_at <= now
+        ).order_by(OutboundEmail.next_attempt_at).limit(config['EMAIL_BATCH_SIZE']).with_for_update(
+            skip_locked=True
+        ).all()
+
+        for email in batch:
+            email.attempts += 1
+            try:
+                self._send(self._build_message(email))
+            except (smtplib.SMTPException, OSError) as ex:
+                self._disconnect()
+                email.last_error = str(ex)
+                if email.attempts >= config['EMAIL_MAX_ATTEMPTS']:
+                    email.status = 'failed'
+                    self.app.logger.error(f"Giving up on email {email.id} to {email.to_email}: {ex}")
+                else:
+                    backoff = config['EMAIL_RETRY_BACKOFF'] * 2 ** (email.attempts - 1)
+                    email.next_attempt_at = now + timedelta(seconds=backoff)
+                continue
+            email.status = 'sent'
+            email.sent_at = datetime.now(timezone.utc)
+            email.last_error = None
+
+        db.session.commit()
+        return len(batch)
+
+    def _build_message(self, email):
+        msg = EmailMessage()
+        msg['Subject'] = email.subject
+        msg['From'] = self.app.config['EMAIL_SENDER']
+        msg['To'] = email.to_email
+        msg.set_content(email.body)
+        return msg
+
+    def _connect(self):
+        config = self.app.config
+        smtp = smtplib.SMTP(config['SMTP_HOST'], config['SMTP_PORT'], timeout=30)
+        if config['SMTP_STARTTLS']:
+            smtp.starttls()
+        smtp.login(config['SMTP_USER'], config['SMTP_PASS'])
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    @timed_call(smtp_send_duration)
+    def _send(self, msg):
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped our idle connection; reconnect once before counting a failure
+            self._smtp = self._connect()
+            self._smtp.send_message(msg)
+        self._smtp_last_used = time.monotonic()
@@ -0,0 +1,83 @@
+# backend/app/garbage.py
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from . import db
+from .models import StorageTombstone, File, Blob
+from .storage import get_storage
+from .workers import BackgroundWorker
+
+
+def collect_garbage(max_batches=None):
+    # Drains due tombstones in batches of GC_BATCH_SIZE keys, one bulk storage
+    # delete per batch. Returns counts of reclaimed, skipped (still referenced)
+    # and failed keys.
+    config = current_app.config
+    storage = get_storage()
+    report = {'reclaimed': 0, 'skipped': 0, 'failed': 0}
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        now = datetime.now(timezone.utc)
+        batch = StorageTombstone.query.filter(
+            StorageTombstone.next_attempt_at <= now
+        ).order_by(StorageTombstone.id).limit(config['GC_BATCH_SIZE']).with_for_update(skip_locked=True).all()
+        if not batch:
+            break
+        batches += 1
+
+        # Claim the batch before checking which keys are live. On PostgreSQL the rows are already
+        # locked; on SQLite the delete takes the write lock. Either way an upload that acquires one
+        # of these blobs again (and removes its tombstone) has committed before the check below
+        # or waits until this batch's objects are gone, and then stores its object again.
+        claimed = set(db.session.execute(
+            db.delete(StorageTombstone).where(StorageTombstone.id.in_([t.id for t in batch])).returning(
+                StorageTombstone.id
+            ),
+            execution_options={'synchronize_session': False}
+        ).scalars())
+        batch = [t for t in batch if t.id in claimed]
+        for tombstone in batch:
+            db.session.expunge(tombstone)
+
+        keys = {t.s3_key for t in batch}
+        # Content-addressed keys can be referenced again after their tombstone was written
+        live = set(db.session.execute(db.select(File.s3_key).where(File.s3_key.in_(keys))).scalars())
+        live |= set(db.session.execute(db.select(Blob.s3_key).where(Blob.s3_key.in_(keys))).scalars())
+        to_delete = sorted(keys - live)
+
+        try:
+            errors = storage.delete_many(to_delete) if to_delete else {}
+        except Exception as ex:
+            current_app.logger.error(f"Error deleting {len(to_delete)} stored objects: {ex}")
+            errors = {key: str(ex) for key in to_delete}
+
+        for tombstone in batch:
+            if tombstone.s3_key in errors:
+                attempts = tombstone.attempts + 1
+                backoff = min(config['GC_RETRY_BACKOFF'] * 2 ** (attempts - 1), 86400)
+                db.session.add(StorageTombstone(
+                    s3_key=tombstone.s3_key, attempts=attempts, last_error=errors[tombstone.s3_key],
+                    next_attempt_at=now + timedelta(seconds=backoff), created_at=tombstone.created_at
+                ))
+                report['failed'] += 1
+            else:
+                report['skipped' if tombstone.s3_key in live else 'reclaimed'] += 1
+        db.session.commit()
+
+    if any(report.values()):
+        current_app.logger.info(
+            f"Garbage collection: reclaimed {report['reclaimed']}, skipped {report['skipped']}, "
+            f"failed {report['failed']}"
+        )
+    return report
+
+
+class GarbageCollector(BackgroundWorker):
+    name = 'garbage-collector'
+
+    def poll_interval(self):
+        return self.app.config['GC_POLL_INTERVAL']
+
+    def run_once(self):
+        report = collect_garbage(max_batches=1)
+        return report['reclaimed'] + report['skipped']
@@ -0,0 +1,226 @@
+# backend/app/metrics.py
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# Values are per process; with several Gunicorn workers, scrape each one or aggregate upstream
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent handling requests.', ['method', 'route', 'status']
+))
+http_request_db_queries = registry.register(Histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', ['route'], COUNT_BUCKETS
+))
+http_request_db_duration = registry.register(Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL statements per request.', ['route']
+))
+db_query_duration = registry.register(Histogram(
+    'db_query_duration_seconds', 'Time spent in individual SQL statements.'
+))
+s3_operation_duration = registry.register(Histogram(
+    's3_operation_duration_seconds', 'Time spent in S3 calls and presigning.', ['operation', 'outcome']
+))
+smtp_send_duration = registry.register(Histogram(
+    'smtp_send_duration_seconds', 'Time spent delivering one email over SMTP.', ['outcome']
+))
+verification_sweep_rows = registry.register(Counter(
+    'verification_sweep_rows', 'Expired email verification rows deleted by the sweeper.'
+))
+verification_sweep_runs = registry.register(Counter(
+    'verification_sweep_runs', 'Runs of the email verification sweeper.'
+))
+
+
+@contextmanager
+def timed(histogram, **labels):
+    # Observes the block's duration with outcome="ok" or "error"
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        histogram.observe(time.perf_counter() - start, outcome=outcome, **labels)
+
+
+def timed_call(histogram, **labels):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(histogram, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    db_query_duration.observe(elapsed)
+    if has_request_context() and 'sql' in g:
+        sql = g.sql
+        sql['count'] += 1
+        sql['time'] += elapsed
+        if len(sql['queries']) < current_app.config['SLOW_REQUEST_MAX_QUERIES']:
+            sql['queries'].append((statement, elapsed))
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is not called for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start_time'):
+        connection.info['query_start_time'].pop()
+
+
+_engine_events_lock = threading.Lock()
+_engine_events_registered = False
+
+
+def _register_engine_events():
+    # Listening on the Engine class covers every engine the app creates, replicas included
+    global _engine_events_registered
+    with _engine_events_lock:
+        if not _engine_events_registered:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+            _engine_events_registered = True
+
+
+def _start_request_timer():
+    g.request_start_time = time.perf_counter()
+    g.sql = {'count': 0, 'time': 0.0, 'queries': []}
+
+
+def _record_request(response):
+    if 'request_start_time' not in g:
+        return response
+    duration = time.perf_counter() - g.request_start_time
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    sql = g.sql
+    http_request_duration.observe(duration, method=request.method, route=route, status=str(response.status_code))
+    http_request_db_queries.observe(sql['count'], route=route)
+    http_request_db_duration.observe(sql['time'], route=route)
+
+    if duration >= current_app.config['SLOW_REQUEST_THRESHOLD']:
+        queries = '\n'.join(f"  {elapsed * 1000:8.2f}ms  {' '.join(statement.split())}"
+                            for statement, elapsed in sql['queries'])
+        current_app.logger.warning(
+            f"Slow request: {request.method} {request.full_path} -> {response.status_code} in "
+            f"{duration * 1000:.1f}ms, {sql['count']} queries in {sql['time'] * 1000:.1f}ms\n{queries}"
+        )
+    return response
+
+
+def metrics_view():
+    token = current_app.config['METRICS_AUTH_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return Response('Unauthorized\n', 401, mimetype='text/plain')
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+    _register_engine_events()
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,7 +1,9 @@
 
+import secrets
 from datetime import datetime, timezone
+from sqlalchemy import DDL, event
 from . import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from .passwords import get_password_hasher
 
 
 class EmailVerification(db.Model):
@@ -12,11 +14,32 @@ class EmailVerification(db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     code = db.Column(db.String(6), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     last_sent = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     attempts = db.Column(db.Integer, default=0)
 
 
+class OutboundEmail(db.Model):
+    __tablename__ = 'outbound_email'
+    id = db.Column(db.Integer, primary_key=True)
+    # Unguessable id handed to the registering client for GET /emails/<status_token>/status
+    status_token = db.Column(db.String(43), unique=True, nullable=False, default=lambda: secrets.token_urlsafe(32))
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    # pending -> sent, or failed once max attempts are used up
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_outbound_email_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+
 class User(db.Model):
     __tablename__ = 'user'
     id = db.Column(db.Integer, primary_key=True)
@@ -24,14 +47,31 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # Bumped whenever this user's owned or shared file listing changes; drives listing ETags
+    files_version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    # Bytes in files this user owns, kept in step with uploads and deletes; see reconcile-usage
+    storage_used = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    # Per-user override of DEFAULT_STORAGE_QUOTA; 0 means unlimited
+    storage_quota = db.Column(db.BigInteger)
 
     files = db.relationship('File', backref='owner', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_password_hasher().verify(self.password_hash, password)
+
+
+class Blob(db.Model):
+    # One stored object per distinct content, shared by every File with that SHA-256
+    __tablename__ = 'blob'
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    s3_key = db.Column(db.String(255), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
 
 class File(db.Model):
@@ -39,13 +79,61 @@ class File(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
-    s3_key = db.Column(db.String(255), nullable=False)
-    size = db.Column(db.Integer)
+    s3_key = db.Column(db.String(255), nullable=False, index=True)
+    size = db.Column(db.BigInteger)
+    # Set for content-addressed uploads; older and direct-to-S3 uploads own their object outright
+    blob_id = db.Column(db.Integer, db.ForeignKey('blob.id'), index=True)
     upload_time = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     last_modified = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     # Define a bidirectional relationship with SharedFile.
     shared_with = db.relationship('SharedFile', back_populates='file', cascade="all, delete-orphan", lazy=True)
+    group_shares = db.relationship('GroupShare', back_populates='file', cascade="all, delete-orphan", lazy=True)
+
+    __table_args__ = (
+        # Serves both "files owned by X" and the keyset-paginated owned listing
+        db.Index('ix_file_user_id_upload_time', 'user_id', 'upload_time', 'id'),
+    )
+
+
+# Trigram index behind /files/search on PostgreSQL, so substring matches on filename can be
+# answered from an index. Alembic cannot express it; it is created with the file table and
+# by migration 9c4e1b7d2f30, and migrations/env.py keeps autogenerate from dropping it.
+FILE_SEARCH_INDEX = 'ix_file_filename_trgm'
+
+event.listen(File.__table__, 'after_create', DDL(
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+).execute_if(dialect='postgresql'))
+event.listen(File.__table__, 'after_create', DDL(
+    f"CREATE INDEX IF NOT EXISTS {FILE_SEARCH_INDEX} ON file USING gin (filename gin_trgm_ops)"
+).execute_if(dialect='postgresql'))
+
+
+class StorageTombstone(db.Model):
+    # Outbox of stored objects to remove, written in the same transaction that drops
+    # their last reference and drained in batches by the garbage collector
+    __tablename__ = 'storage_tombstone'
+    id = db.Column(db.Integer, primary_key=True)
+    s3_key = db.Column(db.String(255), nullable=False, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class UploadSession(db.Model):
+    # A direct-to-S3 multipart upload that the client can resume until it is completed or aborted
+    __tablename__ = 'upload_session'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    s3_key = db.Column(db.String(255), nullable=False, unique=True)
+    upload_id = db.Column(db.String(1024), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    part_size = db.Column(db.BigInteger, nullable=False)
+    # active -> completed | aborted
+    status = db.Column(db.String(20), nullable=False, default='active')
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
 
 class SharedFile(db.Model):
@@ -59,3 +147,69 @@ class SharedFile(db.Model):
     file = db.relationship('File', back_populates='shared_with')
     # Add a relationship to fetch the user object for 'shared_with_user_id'
     shared_with_user = db.relationship('User', backref='shared_files')
+
+    __table_args__ = (
+        # A file is shared with a given user at most once; also covers lookups by file_id
+        db.Index('uq_sharedfile_file_id_shared_with_user_id', 'file_id', 'shared_with_user_id', unique=True),
+        # Serves both "files shared with X" and the keyset-paginated shared listing
+        db.Index('ix_sharedfile_shared_with_user_id_share_timestamp', 'shared_with_user_id', 'share_timestamp', 'id'),
+    )
+
+
+class Group(db.Model):
+    # A named set of users that files can be shared with in a single GroupShare row
+    __tablename__ = 'user_group'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    owner = db.relationship('User')
+
+
+class GroupMembership(db.Model):
+    __tablename__ = 'group_membership'
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('user_group.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    added_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('uq_group_membership_group_id_user_id', 'group_id', 'user_id', unique=True),
+        # Resolves "groups of user X" for access checks and the shared listing
+        db.Index('ix_group_membership_user_id_group_id', 'user_id', 'group_id'),
+    )
+
+
+class GroupShare(db.Model):
+    # A file shared with every current member of a group; membership changes never touch it
+    __tablename__ = 'group_share'
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('file.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('user_group.id'), nullable=False)
+    access_level = db.Column(db.String(20), default='read')
+    share_timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    file = db.relationship('File', back_populates='group_shares')
+    group = db.relationship('Group')
+
+    __table_args__ = (
+        # A file is shared with a given group at most once; also covers lookups by file_id
+        db.Index('uq_group_share_file_id_group_id', 'file_id', 'group_id', unique=True),
+        # Serves "files shared with the groups of X", joined from group_membership
+        db.Index('ix_group_share_group_id_share_timestamp', 'group_id', 'share_timestamp', 'id'),
+    )
+
+
+def dialect_insert(model):
+    # An INSERT construct that supports on_conflict_do_nothing/do_update on the databases we run on
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return insert(model)
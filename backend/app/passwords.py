@@ -0,0 +1,102 @@
+# backend/app/passwords.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Runs PBKDF2 in a small process pool so a burst of logins cannot pin every request
+    # thread (or the GIL) on hashing. At most queue_max hashes may be running or waiting;
+    # beyond that callers get PasswordHasherBusy straight away instead of queueing.
+
+    def __init__(self, method, workers, queue_max, timeout):
+        self.method = method
+        self.workers = workers
+        self.queue_max = queue_max
+        self.timeout = timeout
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Pool processes belong to the process that started them; a forked worker starts its own
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_max)
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._pool
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        release = True
+        try:
+            # A worker that dies (e.g. OOM-killed) breaks the whole pool, so it is replaced
+            # and the hash retried once before giving up
+            for _ in range(2):
+                pool = self._get_pool()
+                try:
+                    future = pool.submit(fn, *args)
+                    return future.result(timeout=self.timeout)
+                except BrokenProcessPool:
+                    self._discard_pool(pool)
+                except TimeoutError:
+                    # The hash keeps running; its slot is freed once it finishes
+                    release = False
+                    future.add_done_callback(lambda _: self._slots.release())
+                    raise PasswordHasherBusy()
+            raise PasswordHasherBusy()
+        finally:
+            if release:
+                self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+def create_password_hasher(app):
+    config = app.config
+    return PasswordHasher(
+        config['PASSWORD_HASH_METHOD'],
+        config['PASSWORD_HASH_WORKERS'],
+        config['PASSWORD_HASH_QUEUE_MAX'],
+        config['PASSWORD_HASH_TIMEOUT']
+    )
+
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
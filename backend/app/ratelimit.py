@@ -0,0 +1,139 @@
+# backend/app/ratelimit.py
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, jsonify
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit):
+    # "10/minute" -> (capacity 10, refill rate in tokens per second)
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour|day)\s*', limit)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {limit}")
+    count = int(match.group(1))
+    return count, count / PERIODS[match.group(2)]
+
+
+class MemoryRateLimiter:
+    # Per-process token buckets, kept in least recently hit order. Once there are more than
+    # max_keys, each hit evicts the stalest bucket, so memory stays bounded and every hit
+    # costs O(1) even while a flood of distinct keys keeps the table full.
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate):
+        # Returns (allowed, seconds until the next token)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisRateLimiter:
+    # Token buckets shared by every process, kept in Redis hashes and updated atomically by a
+    # Lua script using the Redis server clock.
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+local tokens = tonumber(bucket[1]) or capacity
+local last = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'last', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.prefix = prefix
+        self._client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    def hit(self, key, capacity, rate):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate])
+        if allowed:
+            return True, 0
+        return False, (1 - float(tokens)) / rate
+
+    def reset(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+
+def create_rate_limiter(app):
+    url = app.config['RATE_LIMIT_STORAGE_URL']
+    if url.startswith('memory://'):
+        return MemoryRateLimiter(app.config['RATE_LIMIT_MAX_KEYS'])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL points at Redis but the redis package is not installed")
+        return RedisRateLimiter(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL: {url}")
+
+
+def remote_addr():
+    return request.remote_addr
+
+
+def json_field(name):
+    def key():
+        data = request.get_json(silent=True) or {}
+        value = data.get(name)
+        return str(value).strip().lower() if value is not None else None
+    return key
+
+
+def rate_limit(scope, key=remote_addr):
+    # Rejects the request with 429 once the bucket for (scope, key()) is empty. The limit is
+    # read from the RATE_LIMITS config entry for the scope, e.g. {'login-ip': '20/minute'}.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            limit = config['RATE_LIMITS'].get(scope)
+            value = key()
+            if not config['RATE_LIMIT_ENABLED'] or not limit or value is None:
+                return view(*args, **kwargs)
+
+            capacity, rate = parse_limit(limit)
+            try:
+                allowed, retry_after = current_app.extensions['rate_limiter'].hit(f"{scope}:{value}", capacity, rate)
+            except Exception as ex:
+                # A shared store outage must not take logins down with it
+                current_app.logger.warning(f"Rate limiter unavailable, allowing request: {ex}")
+                return view(*args, **kwargs)
+            if not allowed:
+                retry_after = max(1, math.ceil(retry_after))
+                response = jsonify({'msg': 'Too many requests, please try again later', 'retry_after': retry_after})
+                return response, 429, {'Retry-After': str(retry_after)}
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
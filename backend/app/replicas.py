@@ -0,0 +1,104 @@
+# backend/app/replicas.py
+import random
+import time
+from functools import wraps
+from flask import current_app, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+from werkzeug.exceptions import NotFound
+
+
+class RoutingSession(Session):
+    # Sends plain SELECTs to the replica engine chosen for the request by @replica_reads.
+    # Everything else (flushes, INSERT/UPDATE/DELETE, locking reads) uses the normal bind,
+    # and the session remembers that it wrote so the caller can be pinned to the primary.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, Select) and clause._for_update_arg is None and not self._flushing:
+            replica = self.info.get('replica')
+            if bind is None and replica is not None:
+                return replica
+        else:
+            self.info['wrote'] = True
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+def _pins():
+    return current_app.extensions['replica_pins']
+
+
+def _current_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def is_pinned(user_id):
+    until = _pins().get(user_id)
+    return until is not None and until > time.monotonic()
+
+
+def pin_to_primary(user_id):
+    # Read-your-writes within this process: the user's reads skip replicas for a short window
+    pins = _pins()
+    now = time.monotonic()
+    pins[user_id] = now + current_app.config['REPLICA_PIN_SECONDS']
+    if len(pins) > 10000:
+        for key, until in list(pins.items()):
+            if until <= now:
+                pins.pop(key, None)
+
+
+def use_primary():
+    from . import db
+    db.session.info.pop('replica', None)
+
+
+def using_replica():
+    from . import db
+    return 'replica' in db.session.info
+
+
+def replica_reads(view):
+    # For read-only views: SELECTs go to a random replica unless the caller wrote recently in
+    # this process. A 404 from a replica is retried on the primary, since the row may simply
+    # not have replicated yet.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from . import db
+        replicas = [engine for key, engine in db.engines.items() if key and key.startswith('replica_')]
+        user_id = _current_user_id()
+        if not replicas or (user_id is not None and is_pinned(user_id)):
+            return view(*args, **kwargs)
+
+        db.session.info['replica'] = random.choice(replicas)
+        try:
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 404 or not using_replica():
+                    return response
+            except NotFound:
+                if not using_replica():
+                    raise
+            db.session.rollback()
+            use_primary()
+            return view(*args, **kwargs)
+        finally:
+            use_primary()
+    return wrapper
+
+
+def _pin_writers(response):
+    from . import db
+    if has_request_context() and db.session.info.pop('wrote', False):
+        user_id = _current_user_id()
+        if user_id is not None:
+            pin_to_primary(user_id)
+    return response
+
+
+def init_replicas(app):
+    app.extensions['replica_pins'] = {}
+    if app.config['DATABASE_REPLICA_URLS']:
+        app.after_request(_pin_writers)
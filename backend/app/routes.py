@@ -1,22 +1,56 @@
 
 # backend/app/routes.py
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from .models import User, File, SharedFile, EmailVerification
+from flask import Blueprint, request, jsonify, current_app, make_response, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, current_user
+from .models import User, File, SharedFile, EmailVerification, OutboundEmail, Blob, UploadSession, \
+    Group, GroupMembership, GroupShare, dialect_insert
 from . import db
-from .services import upload_file_to_s3, generate_presigned_url, generate_code, send_verification_email
+from .storage import get_storage, LocalStorage
+from sqlalchemy import func, null, tuple_
+from sqlalchemy.orm import aliased, joinedload, selectinload, contains_eager
+from .passwords import get_password_hasher, PasswordHasherBusy
+from .ratelimit import rate_limit, json_field
+from .archive import stream_zip
+from .search import search_files, escape_like
+from .serialization import requested_fields, serialize
+from .replicas import replica_reads, using_replica, use_primary
+from .services import get_download_url, invalidate_download_url, generate_code, \
+    send_verification_email, generate_presigned_post, create_presigned_multipart_upload, complete_multipart_upload, \
+    abort_multipart_upload, get_object_size, presign_upload_parts, list_uploaded_parts, hash_stream, blob_s3_key, \
+    acquire_blob, delete_files, start_garbage_collector, bump_files_version, start_verification_sweeper, \
+    storage_remaining, charge_storage, discard_stored_objects, accessible_files_filter, group_member_ids
+import base64
+import hashlib
+import json
+import math
 import uuid
 from datetime import timezone, timedelta, datetime
+from functools import wraps
+from operator import attrgetter
+from urllib.parse import quote
 import traceback
-from werkzeug.security import generate_password_hash
 
 api_bp = Blueprint('api_bp', __name__)
 
+# S3 refuses multipart uploads with more parts than this
+MAX_MULTIPART_PARTS = 10000
+
+# Room for the multipart/form-data envelope around an uploaded file's bytes
+UPLOAD_ENVELOPE_ALLOWANCE = 64 * 1024
+
+# What a share grants its recipient
+ACCESS_LEVELS = ('read', 'write')
+
 
 def error_response(message, code):
     return jsonify({'msg': message}), code
 
 
+def busy_response():
+    response = jsonify({'msg': 'The server is busy, please try again shortly'})
+    return response, 503, {'Retry-After': '1'}
+
+
 def success_response(message, code=200, **kwargs):
     resp = {'msg': message}
     resp.update(kwargs)
@@ -24,6 +58,8 @@ def success_response(message, code=200, **kwargs):
 
 
 @api_bp.route('/register-initiate', methods=['POST'])
+@rate_limit('register-ip')
+@rate_limit('register-email', key=json_field('email'))
 def register_initiate():
     try:
         data = request.get_json(silent=True) or {}
@@ -37,24 +73,41 @@ def register_initiate():
         if User.query.filter_by(email=email).first():
             return error_response('Email already in use', 409)
 
-        # Create a verification record
+        # Create a verification record, taking over an expired one for the same email
         code = generate_code()
-        expires = datetime.now(timezone.utc) + timedelta(minutes=10)
-        ev = EmailVerification(
-            username=username,
-            email=email,
-            password_hash=generate_password_hash(password),
-            code=code,
-            expires_at=expires
-        )
-        db.session.add(ev)
+        now = datetime.now(timezone.utc)
+        values = {
+            'username': username,
+            'email': email,
+            'password_hash': get_password_hasher().hash(password),
+            'code': code,
+            'created_at': now,
+            'expires_at': now + timedelta(minutes=10),
+            'last_sent': now,
+            'attempts': 0
+        }
+        stmt = dialect_insert(EmailVerification).values(**values)
+        verification_id = db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['email'],
+                set_={k: stmt.excluded[k] for k in values if k != 'email'},
+                where=EmailVerification.expires_at < now
+            ).returning(EmailVerification.id)
+        ).scalar()
         db.session.commit()
+        if verification_id is None:
+            return error_response('A verification code was already sent to this email', 409)
+        start_verification_sweeper()
 
-        # Send the email
-        send_verification_email(email, code)
+        # Queue the email; it is delivered in the background
+        queued = send_verification_email(email, code)
 
-        return success_response('Verification code sent', 200, verification_id=ev.id)
+        return success_response(
+            'Verification code sent', 200, verification_id=verification_id, email_id=queued.status_token
+        )
 
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as ex:
         current_app.logger.error("Error in register-initiate", exc_info=True)
         # Return the exception text so the frontend can display it
@@ -62,6 +115,8 @@ def register_initiate():
 
 
 @api_bp.route('/register-verify', methods=['POST'])
+@rate_limit('verify-ip')
+@rate_limit('verify-session', key=json_field('verification_id'))
 def register_verify():
     try:
         data = request.get_json(silent=True) or {}
@@ -107,6 +162,8 @@ def register_verify():
 
 
 @api_bp.route('/register-resend', methods=['POST'])
+@rate_limit('resend-ip')
+@rate_limit('resend-session', key=json_field('verification_id'))
 def register_resend():
     data = request.get_json(silent=True) or {}
     vid = data.get('verification_id')
@@ -126,13 +183,23 @@ def register_resend():
     ev.attempts = 0
     db.session.commit()
     try:
-        send_verification_email(ev.email, ev.code)
+        queued = send_verification_email(ev.email, ev.code)
     except:
         return error_response('Resend failed', 500)
-    return success_response('Code resent', 200)
+    return success_response('Code resent', 200, email_id=queued.status_token)
+
+
+@api_bp.route('/emails/<email_id>/status', methods=['GET'])
+@replica_reads
+def email_status(email_id):
+    # email_id is the random status token returned at registration, not the row id
+    email = OutboundEmail.query.filter_by(status_token=email_id).first_or_404()
+    return jsonify({'status': email.status, 'attempts': email.attempts}), 200
 
 
 @api_bp.route('/login', methods=['POST'])
+@rate_limit('login-ip')
+@rate_limit('login-account', key=json_field('identifier'))
 def login():
     data = request.get_json(silent=True)
     if not data:
@@ -142,95 +209,723 @@ def login():
     if not identifier or not password:
         return error_response('Missing credentials', 400)
     user = User.query.filter((User.username == identifier) | (User.email == identifier)).first()
-    if user and user.check_password(password):
-        access_token = create_access_token(identity=str(user.id))
-        return jsonify({'access_token': access_token}), 200
-    return error_response('Invalid credentials', 401)
+    try:
+        valid = user is not None and user.check_password(password)
+    except PasswordHasherBusy:
+        return busy_response()
+    if not valid:
+        return error_response('Invalid credentials', 401)
+
+    if get_password_hasher().needs_rehash(user.password_hash):
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            # Keep the old hash; it is upgraded on a later login
+            db.session.rollback()
+    access_token = create_access_token(
+        identity=str(user.id), additional_claims={'username': user.username, 'email': user.email}
+    )
+    return jsonify({'access_token': access_token}), 200
 
 
 @api_bp.route('/user', methods=['GET'])
 @jwt_required()
+@replica_reads
 def get_user():
-    try:
-        user_id = int(get_jwt_identity())
-    except (ValueError, TypeError):
-        return error_response('Invalid token identity', 400)
-    user = User.query.get_or_404(user_id)
-    return jsonify({'username': user.username, 'email': user.email}), 200
+    claims = get_jwt()
+    if 'username' in claims and 'email' in claims:
+        return jsonify({'username': claims['username'], 'email': claims['email']}), 200
+    # Tokens issued before the claims were added
+    return jsonify({'username': current_user.username, 'email': current_user.email}), 200
+
+
+@api_bp.route('/user/usage', methods=['GET'])
+@jwt_required()
+def get_usage():
+    user_id = int(get_jwt_identity())
+    user = db.session.execute(
+        db.select(User.storage_used, User.storage_quota).where(User.id == user_id)
+    ).first()
+    if user is None:
+        return error_response('User not found', 404)
+    quota = user.storage_quota if user.storage_quota is not None else current_app.config['DEFAULT_STORAGE_QUOTA']
+    return jsonify({
+        'used': user.storage_used,
+        'quota': quota or None,
+        'remaining': max(quota - user.storage_used, 0) if quota else None
+    }), 200
 
 
 @api_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_file():
     user_id = get_jwt_identity()
+    # Reject over-quota uploads from Content-Length before the body is read
+    remaining = storage_remaining(user_id)
+    if remaining is not None and (request.content_length or 0) > remaining + UPLOAD_ENVELOPE_ALLOWANCE:
+        return error_response('Storage quota exceeded', 413)
     if 'file' not in request.files:
         return error_response('No file part', 400)
     file_obj = request.files['file']
     if file_obj.filename == '':
         return error_response('No file selected', 400)
 
-    # Create a unique S3 key
-    s3_key = f"{user_id}/{uuid.uuid4()}_{file_obj.filename}"
+    # Store content once under its hash; identical uploads reuse the existing object
+    sha256, size = hash_stream(file_obj.stream)
+    s3_key = blob_s3_key(sha256)
+    if remaining is not None and size > remaining:
+        return error_response('Storage quota exceeded', 413)
 
+    # The object is written before any row is locked; the quota charge, the blob reference and
+    # the file row then go in one short transaction
+    stored = Blob.query.filter_by(sha256=sha256).first() is None
+    db.session.rollback()
     try:
-        upload_file_to_s3(file_obj, s3_key)
+        if stored:
+            get_storage().save(file_obj, s3_key)
     except Exception as e:
         current_app.logger.error(f"Error uploading file: {e}")
         return error_response("Error uploading file", 500)
 
-    new_file = File(user_id=user_id, filename=file_obj.filename, s3_key=s3_key, size=0)
+    if not charge_storage(user_id, size):
+        # A concurrent upload used up the quota in the meantime
+        db.session.rollback()
+        if stored:
+            # The collector leaves the object alone if another file references the blob by then
+            discard_stored_objects([s3_key])
+            db.session.commit()
+            start_garbage_collector()
+        return error_response('Storage quota exceeded', 413)
+    blob_id, ref_count = acquire_blob(sha256, size)
+    new_file = File(user_id=user_id, filename=file_obj.filename, s3_key=s3_key, size=size, blob_id=blob_id)
     db.session.add(new_file)
+    bump_files_version([user_id])
     db.session.commit()
 
+    if ref_count == 1:
+        # This upload recreated the blob. A collector pass that claimed an old tombstone for the key
+        # has finished by now (acquire_blob waits for it) but may have deleted the object, so
+        # store it again if it is gone. From here on the committed blob keeps it live.
+        try:
+            get_storage().size(s3_key)
+        except Exception:
+            try:
+                file_obj.stream.seek(0)
+                get_storage().save(file_obj, s3_key)
+            except Exception as e:
+                current_app.logger.error(f"Error uploading file: {e}")
+                delete_files([new_file])
+                db.session.commit()
+                start_garbage_collector()
+                return error_response("Error uploading file", 500)
+
     return success_response('File uploaded', 201, file_id=new_file.id)
 
 
+@api_bp.route('/upload/initiate', methods=['POST'])
+@jwt_required()
+def upload_initiate():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    filename = data.get('filename')
+    size = data.get('size')
+    if not filename or not isinstance(filename, str) or not is_id(size) or size < 0:
+        return error_response('Missing filename or size', 400)
+
+    if not get_storage().supports_direct_upload:
+        return error_response('Direct uploads are not supported by this storage backend', 501)
+
+    config = current_app.config
+    if size > config['DIRECT_UPLOAD_MAX_SIZE']:
+        return error_response('File is too large', 413)
+    # The presigned POST policy caps small uploads at the declared size; multipart part URLs
+    # carry no limit, so upload-complete rejects a multipart object of any other size
+    remaining = storage_remaining(user_id)
+    if remaining is not None and size > remaining:
+        return error_response('Storage quota exceeded', 413)
+
+    s3_key = f"{user_id}/{uuid.uuid4()}_{filename}"
+    expiration = config['DIRECT_UPLOAD_EXPIRATION']
+
+    try:
+        if size < config['MULTIPART_THRESHOLD']:
+            post = generate_presigned_post(s3_key, size, expiration)
+            return jsonify({
+                'upload_type': 'post',
+                's3_key': s3_key,
+                'url': post['url'],
+                'fields': post['fields']
+            }), 200
+
+        # Grow the part size for very large files so we stay under S3's part limit
+        part_size = max(config['MULTIPART_PART_SIZE'], math.ceil(size / MAX_MULTIPART_PARTS))
+        part_count = math.ceil(size / part_size)
+        upload_id, part_urls = create_presigned_multipart_upload(s3_key, part_count, expiration)
+    except Exception as e:
+        current_app.logger.error(f"Error initiating upload: {e}")
+        return error_response("Error initiating upload", 500)
+
+    # Persist the session so the client can pick up from the last finished part
+    session = UploadSession(
+        user_id=user_id, filename=filename, s3_key=s3_key, upload_id=upload_id, size=size, part_size=part_size
+    )
+    db.session.add(session)
+    db.session.commit()
+
+    return jsonify({
+        'upload_type': 'multipart',
+        'session_id': session.id,
+        's3_key': s3_key,
+        'upload_id': upload_id,
+        'part_size': part_size,
+        'parts': part_urls
+    }), 200
+
+
+@api_bp.route('/upload/sessions/<int:session_id>', methods=['GET'])
+@jwt_required()
+def upload_resume(session_id):
+    user_id = int(get_jwt_identity())
+    session = UploadSession.query.get_or_404(session_id)
+    if session.user_id != user_id:
+        return error_response('You cannot resume an upload that you did not start', 403)
+    if session.status != 'active':
+        return error_response(f"Upload session is {session.status}", 409)
+
+    part_count = math.ceil(session.size / session.part_size)
+    try:
+        completed = list_uploaded_parts(session.s3_key, session.upload_id)
+        done = {part['part_number'] for part in completed}
+        remaining = [n for n in range(1, part_count + 1) if n not in done]
+        part_urls = presign_upload_parts(
+            session.s3_key, session.upload_id, remaining, current_app.config['DIRECT_UPLOAD_EXPIRATION']
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error resuming upload: {e}")
+        return error_response("Error resuming upload", 500)
+
+    return jsonify({
+        'upload_type': 'multipart',
+        'session_id': session.id,
+        's3_key': session.s3_key,
+        'upload_id': session.upload_id,
+        'part_size': session.part_size,
+        'completed_parts': completed,
+        'parts': part_urls
+    }), 200
+
+
+@api_bp.route('/upload/complete', methods=['POST'])
+@jwt_required()
+def upload_complete():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    s3_key = data.get('s3_key')
+    filename = data.get('filename')
+    upload_id = data.get('upload_id')
+    parts = data.get('parts')
+    if not s3_key or not filename:
+        return error_response('Missing s3_key or filename', 400)
+
+    # Keys are handed out by upload-initiate under the caller's prefix
+    if not s3_key.startswith(f"{user_id}/"):
+        return error_response('You cannot complete an upload that you did not start', 403)
+    if File.query.filter_by(s3_key=s3_key).first():
+        return error_response('Upload already completed', 409)
+    session = None
+    if upload_id:
+        session = UploadSession.query.filter_by(s3_key=s3_key, upload_id=upload_id).first()
+        if session is None or session.status != 'active':
+            return error_response('Unknown or finished upload session', 400)
+
+    try:
+        if upload_id:
+            # A resumed client may not have every ETag; S3 knows which parts arrived
+            complete_multipart_upload(s3_key, upload_id, parts or list_uploaded_parts(s3_key, upload_id))
+        size = get_object_size(s3_key)
+    except Exception as e:
+        current_app.logger.error(f"Error completing upload: {e}")
+        return error_response("Error completing upload", 500)
+
+    # Part URLs do not limit what is uploaded, and a resume completed from a partial part list
+    # would leave a truncated object; either way the object no longer matches the session
+    if session is not None and size != session.size:
+        discard_stored_objects([s3_key])
+        session.status = 'aborted'
+        db.session.commit()
+        start_garbage_collector()
+        return error_response(f"Uploaded {size} bytes but {session.size} were declared", 400)
+
+    if not charge_storage(user_id, size):
+        db.session.rollback()
+        discard_stored_objects([s3_key])
+        UploadSession.query.filter_by(s3_key=s3_key).update({'status': 'aborted'})
+        db.session.commit()
+        start_garbage_collector()
+        return error_response('Storage quota exceeded', 413)
+    new_file = File(user_id=user_id, filename=filename, s3_key=s3_key, size=size)
+    db.session.add(new_file)
+    UploadSession.query.filter_by(s3_key=s3_key).update({'status': 'completed'})
+    bump_files_version([user_id])
+    db.session.commit()
+
+    return success_response('File uploaded', 201, file_id=new_file.id)
+
+
+@api_bp.route('/upload/abort', methods=['POST'])
+@jwt_required()
+def upload_abort():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    s3_key = data.get('s3_key')
+    upload_id = data.get('upload_id')
+    if not s3_key or not upload_id:
+        return error_response('Missing s3_key or upload_id', 400)
+    if not s3_key.startswith(f"{user_id}/"):
+        return error_response('You cannot abort an upload that you did not start', 403)
+
+    try:
+        abort_multipart_upload(s3_key, upload_id)
+    except Exception as e:
+        current_app.logger.error(f"Error aborting upload: {e}")
+        return error_response("Error aborting upload", 500)
+    UploadSession.query.filter_by(s3_key=s3_key).update({'status': 'aborted'})
+    db.session.commit()
+    return success_response('Upload aborted')
+
+
+def files_etag(view):
+    # Listings only change when the user's files_version is bumped, so a matching
+    # If-None-Match is answered with 304 after a single primary-key lookup.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = int(get_jwt_identity())
+        version_query = db.select(User.files_version).where(User.id == user_id)
+        # The version is read from the primary; a replica that has not caught up with it
+        # would serve a listing older than the ETag, so fall back to the primary then
+        version = db.session.execute(version_query, bind_arguments={'bind': db.engine}).scalar()
+        etag = hashlib.sha1(f"{user_id}:{version}:{request.full_path}".encode()).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            if using_replica() and (db.session.execute(version_query).scalar() or 0) < (version or 0):
+                use_primary()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        # Weak, because the tag follows the listing's content rather than its bytes, which
+        # differ with the negotiated Content-Encoding; 200 and 304 then carry the same validator
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
+
+
+# Serializers are tables of field name -> getter so ?fields= can select a subset. Timestamps
+# are left as datetimes for the JSON provider, which writes them as ISO 8601 UTC.
+OWNED_FILE_FIELDS = {
+    'id': attrgetter('id'),
+    'filename': attrgetter('filename'),
+    's3_key': attrgetter('s3_key'),
+    'upload_time': attrgetter('upload_time'),
+    'shared_with_users': lambda f: [
+        {
+            'id': sf.shared_with_user.id,
+            'email': sf.shared_with_user.email,
+            'username': sf.shared_with_user.username
+        }
+        for sf in f.shared_with
+    ],
+    'shared_with_groups': lambda f: [{'id': gs.group.id, 'name': gs.group.name} for gs in f.group_shares],
+}
+
+# Takes a SharedFile or a GroupShare
+SHARED_FILE_FIELDS = {
+    'id': lambda share: share.file.id,
+    'filename': lambda share: share.file.filename,
+    's3_key': lambda share: share.file.s3_key,
+    'shared_by': lambda share: share.file.owner.username if share.file.owner else str(share.file.user_id),
+    'shared_at': attrgetter('share_timestamp'),
+    'access_level': attrgetter('access_level'),
+    'group': lambda share: {'id': share.group.id, 'name': share.group.name} if isinstance(share, GroupShare) else None,
+    'via_group': lambda share: isinstance(share, GroupShare),
+}
+
+# Rows of the /files/shared union
+SHARED_ROW_FIELDS = {
+    'id': attrgetter('file_id'),
+    'filename': attrgetter('filename'),
+    's3_key': attrgetter('s3_key'),
+    'shared_by': attrgetter('shared_by'),
+    'shared_at': attrgetter('shared_at'),
+    'access_level': attrgetter('access_level'),
+    'group': lambda row: {'id': row.group_id, 'name': row.group_name} if row.group_id is not None else None,
+    'via_group': lambda row: row.group_id is not None,
+}
+
+SEARCH_RESULT_FIELDS = {
+    'id': attrgetter('id'),
+    'filename': attrgetter('filename'),
+    'size': attrgetter('size'),
+    'upload_time': attrgetter('upload_time'),
+    'owner': attrgetter('owner'),
+    'owned': lambda row: bool(row.owned),
+}
+
+
+def serialize_owned_file(f, fields=OWNED_FILE_FIELDS):
+    return serialize(f, fields)
+
+
+def serialize_shared_file(share, fields=SHARED_FILE_FIELDS):
+    return serialize(share, fields)
+
+
+def invalid_fields_response():
+    return error_response('Unknown name in fields', 400)
+
+
+def group_shares_for(user_id):
+    # Conditions selecting one GroupShare per file the user reaches only through groups: files
+    # they own or that are also shared with them directly are left out, and of several groups
+    # sharing the same file the earliest share wins. Both checks are index lookups by file_id.
+    earlier, earlier_membership = aliased(GroupShare), aliased(GroupMembership)
+    return (
+        GroupMembership.user_id == user_id,
+        File.user_id != user_id,
+        ~db.select(SharedFile.id).where(
+            SharedFile.file_id == GroupShare.file_id, SharedFile.shared_with_user_id == user_id
+        ).exists(),
+        ~db.select(earlier.id).join(
+            earlier_membership, earlier_membership.group_id == earlier.group_id
+        ).where(
+            earlier.file_id == GroupShare.file_id, earlier.id < GroupShare.id, earlier_membership.user_id == user_id
+        ).exists(),
+    )
+
+
+def owned_file_loads(fields):
+    # Eager loads for the relationship fields that were asked for; the others are never touched
+    loads = []
+    if 'shared_with_users' in fields:
+        loads.append(selectinload(File.shared_with).joinedload(SharedFile.shared_with_user))
+    if 'shared_with_groups' in fields:
+        loads.append(selectinload(File.group_shares).joinedload(GroupShare.group))
+    return loads
+
+
 @api_bp.route('/files', methods=['GET'])
 @jwt_required()
+@replica_reads
+@files_etag
 def list_files():
     user_id = int(get_jwt_identity())
-    owned_files = File.query.filter_by(user_id=user_id).all()
-    shared = SharedFile.query.filter_by(shared_with_user_id=user_id).all()
-
-    owned_list = [{
-        'id': f.id,
-        'filename': f.filename,
-        's3_key': f.s3_key,
-        'upload_time': f.upload_time.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        'shared_with_users': [
-            {
-                'id': sf.shared_with_user.id,
-                'email': sf.shared_with_user.email,
-                'username': sf.shared_with_user.username
-            }
-            for sf in f.shared_with
-        ]
-    } for f in owned_files]
-
-    shared_list = [{
-        'id': share.file.id,
-        'filename': share.file.filename,
-        's3_key': share.file.s3_key,
-        'shared_by': share.file.owner.username if share.file.owner else str(share.file.user_id),
-        'shared_at': share.share_timestamp.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        'access_level': share.access_level
-    } for share in shared]
+    fields = requested_fields(OWNED_FILE_FIELDS, SHARED_FILE_FIELDS)
+    if fields is None:
+        return invalid_fields_response()
+    owned_fields, shared_fields = fields
+    # Load every relationship the serializers below touch up front, so the
+    # listing costs at most five queries no matter how many files or shares there are.
+    owned_files = File.query.filter_by(user_id=user_id).options(*owned_file_loads(owned_fields)).all()
+    shared = SharedFile.query.filter_by(shared_with_user_id=user_id).options(
+        joinedload(SharedFile.file).joinedload(File.owner)
+    ).all()
+    group_shared = GroupShare.query.join(
+        GroupMembership, GroupMembership.group_id == GroupShare.group_id
+    ).join(GroupShare.file).filter(*group_shares_for(user_id)).options(
+        contains_eager(GroupShare.file).joinedload(File.owner), joinedload(GroupShare.group)
+    ).all()
+
+    owned_list = [serialize_owned_file(f, owned_fields) for f in owned_files]
+    shared_list = [serialize_shared_file(share, shared_fields) for share in shared + group_shared]
 
     return jsonify({'owned_files': owned_list, 'shared_files': shared_list}), 200
 
 
+def encode_cursor(sort, value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort, value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor, sort, is_datetime):
+    cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise ValueError('Cursor does not match the requested sort')
+    if is_datetime:
+        value = datetime.fromisoformat(value)
+    return value, row_id
+
+
+# Keyset pagination: rows are ordered by (sort column, id) and the cursor carries the
+# last row's pair, so every page is an index range scan regardless of how deep it is.
+# sort_columns maps a sort name to (column, row -> value); a leading '-' sorts descending.
+def paginate(query, sort_columns, id_column, serialize):
+    config = current_app.config
+    sort = request.args.get('sort', f"-{next(iter(sort_columns))}")
+    descending = sort.startswith('-')
+    if sort.lstrip('-') not in sort_columns:
+        return error_response(f"Invalid sort, expected one of: {', '.join(sort_columns)}", 400)
+    sort_column, sort_value = sort_columns[sort.lstrip('-')]
+
+    limit = request.args.get('limit', config['FILES_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, config['FILES_PAGE_MAX']))
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            value, row_id = decode_cursor(cursor, sort, isinstance(sort_column.type, db.DateTime))
+        except (ValueError, TypeError):
+            return error_response('Invalid cursor', 400)
+        position = tuple_(sort_column, id_column)
+        query = query.filter(position < (value, row_id) if descending else position > (value, row_id))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, sort_value(last), last.id)
+    return jsonify({'files': [serialize(row) for row in rows], 'next_cursor': next_cursor}), 200
+
+
+def filename_prefix_filter(query, column=File.filename):
+    prefix = request.args.get('prefix')
+    if prefix:
+        query = query.filter(column.like(f"{escape_like(prefix)}%", escape='\\'))
+    return query
+
+
+@api_bp.route('/files/owned', methods=['GET'])
+@jwt_required()
+@replica_reads
+@files_etag
+def list_owned_files():
+    user_id = int(get_jwt_identity())
+    fields = requested_fields(OWNED_FILE_FIELDS)
+    if fields is None:
+        return invalid_fields_response()
+    owned_fields, = fields
+    query = File.query.filter(File.user_id == user_id).options(*owned_file_loads(owned_fields))
+    return paginate(
+        filename_prefix_filter(query),
+        {
+            'upload_time': (File.upload_time, lambda f: f.upload_time),
+            'filename': (File.filename, lambda f: f.filename)
+        },
+        File.id,
+        lambda f: serialize(f, owned_fields)
+    )
+
+
+@api_bp.route('/files/shared', methods=['GET'])
+@jwt_required()
+@replica_reads
+@files_etag
+def list_shared_files():
+    user_id = int(get_jwt_identity())
+    fields = requested_fields(SHARED_ROW_FIELDS)
+    if fields is None:
+        return invalid_fields_response()
+    shared_fields, = fields
+    # Direct shares and shares with the user's groups, the latter through one join on the
+    # membership index, with one row per file. Row ids are interleaved (even: direct, odd: group) so the keyset
+    # cursor stays unique across both tables.
+    columns = (File.id.label('file_id'), File.filename, File.s3_key, User.username.label('shared_by'))
+    direct = db.select(
+        (SharedFile.id * 2).label('id'), *columns, SharedFile.share_timestamp.label('shared_at'),
+        SharedFile.access_level, null().label('group_id'), null().label('group_name')
+    ).join(File, File.id == SharedFile.file_id).join(User, User.id == File.user_id).where(
+        SharedFile.shared_with_user_id == user_id
+    )
+    via_group = db.select(
+        (GroupShare.id * 2 + 1).label('id'), *columns, GroupShare.share_timestamp.label('shared_at'),
+        GroupShare.access_level, Group.id.label('group_id'), Group.name.label('group_name')
+    ).join(GroupMembership, GroupMembership.group_id == GroupShare.group_id).join(
+        Group, Group.id == GroupShare.group_id
+    ).join(File, File.id == GroupShare.file_id).join(User, User.id == File.user_id).where(
+        *group_shares_for(user_id)
+    )
+    shares = db.union_all(direct, via_group).subquery()
+    return paginate(
+        filename_prefix_filter(db.session.query(shares), shares.c.filename),
+        {
+            'shared_at': (shares.c.shared_at, lambda row: row.shared_at),
+            'filename': (shares.c.filename, lambda row: row.filename)
+        },
+        shares.c.id,
+        lambda row: serialize(row, shared_fields)
+    )
+
+
+@api_bp.route('/files/search', methods=['GET'])
+@jwt_required()
+@replica_reads
+@files_etag
+def search_user_files():
+    user_id = int(get_jwt_identity())
+    config = current_app.config
+    query = request.args.get('q', '').strip()
+    if not query:
+        return error_response('Missing search query', 400)
+    if len(query) > 255:
+        return error_response('Search query is too long', 400)
+    fields = requested_fields(SEARCH_RESULT_FIELDS)
+    if fields is None:
+        return invalid_fields_response()
+    result_fields, = fields
+
+    limit = request.args.get('limit', config['FILES_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, config['FILES_PAGE_MAX']))
+    offset = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_query, offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            return error_response('Invalid cursor', 400)
+        if cursor_query != query or not isinstance(offset, int) or offset < 0:
+            return error_response('Invalid cursor', 400)
+    limit = min(limit, config['SEARCH_MAX_RESULTS'] - offset)
+    if limit <= 0:
+        return jsonify({'files': [], 'next_cursor': None}), 200
+
+    rows = search_files(user_id, query, limit + 1, offset)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if offset + limit < config['SEARCH_MAX_RESULTS']:
+            next_cursor = base64.urlsafe_b64encode(json.dumps([query, offset + limit]).encode()).decode()
+    return jsonify({'files': [serialize(row, result_fields) for row in rows], 'next_cursor': next_cursor}), 200
+
+
 @api_bp.route('/download/<int:file_id>', methods=['GET'])
 @jwt_required()
+@replica_reads
 def download_file(file_id):
-    file_obj = File.query.get_or_404(file_id)
+    user_id = int(get_jwt_identity())
+    file_obj = File.query.filter(File.id == file_id, accessible_files_filter(user_id)).first_or_404()
     try:
-        url = generate_presigned_url(file_obj.s3_key)
+        url = get_download_url(file_obj.s3_key, file_obj.filename)
     except Exception as e:
         current_app.logger.error(f"Error generating URL: {e}")
         return error_response("Error generating URL", 500)
     return jsonify({'download_url': url}), 200
 
 
+@api_bp.route('/storage/<token>', methods=['GET'])
+def storage_download(token):
+    # Signed, expiring download links issued by LocalStorage; the token is the authorization
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return error_response('Not found', 404)
+    target = storage.load_token(token)
+    if target is None:
+        return error_response('Download link is invalid or has expired', 403)
+    key, filename = target
+    try:
+        return storage.send(key, filename)
+    except (FileNotFoundError, ValueError):
+        return error_response('File not found', 404)
+
+
+def is_id(value):
+    # JSON true/false arrive as Python bools, which are ints too
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_id_list(values):
+    return isinstance(values, list) and bool(values) and all(is_id(value) for value in values)
+
+
+@api_bp.route('/download/batch', methods=['POST'])
+@jwt_required()
+@replica_reads
+def download_batch():
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    file_ids = data.get('file_ids')
+    if not is_id_list(file_ids):
+        return error_response('file_ids must be a non-empty list of file ids', 400)
+    if len(file_ids) > current_app.config['DOWNLOAD_BATCH_MAX']:
+        return error_response(f"At most {current_app.config['DOWNLOAD_BATCH_MAX']} files per request", 400)
+
+    # One query authorizes the whole batch: owned files plus files shared with the caller
+    files = File.query.filter(File.id.in_(file_ids), accessible_files_filter(user_id)).all()
+
+    try:
+        downloads = [{
+            'id': f.id,
+            'filename': f.filename,
+            'download_url': get_download_url(f.s3_key, f.filename)
+        } for f in files]
+    except Exception as e:
+        current_app.logger.error(f"Error generating URL: {e}")
+        return error_response("Error generating URL", 500)
+
+    found_ids = {f.id for f in files}
+    unavailable = [file_id for file_id in file_ids if file_id not in found_ids]
+    return jsonify({'downloads': downloads, 'unavailable': unavailable}), 200
+
+
+@api_bp.route('/download/zip', methods=['POST'])
+@jwt_required()
+@replica_reads
+def download_zip():
+    user_id = int(get_jwt_identity())
+    config = current_app.config
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    file_ids = data.get('file_ids')
+    if not is_id_list(file_ids):
+        return error_response('file_ids must be a non-empty list of file ids', 400)
+    if len(file_ids) > config['ZIP_MAX_FILES']:
+        return error_response(f"At most {config['ZIP_MAX_FILES']} files per archive", 400)
+    prefetch = data.get('prefetch', config['ZIP_PREFETCH'])
+    if not isinstance(prefetch, bool):
+        return error_response('prefetch must be true or false', 400)
+    name = data.get('archive_name') or 'files.zip'
+    if not isinstance(name, str):
+        return error_response('archive_name must be a string', 400)
+
+    # One query authorizes every file; only plain columns are loaded so nothing ties
+    # the streaming response to the database session
+    files = db.session.execute(
+        db.select(File.id, File.filename, File.s3_key, File.size, File.upload_time).where(
+            File.id.in_(file_ids), accessible_files_filter(user_id)
+        ).order_by(File.id)
+    ).all()
+    found_ids = {f.id for f in files}
+    unavailable = [file_id for file_id in file_ids if file_id not in found_ids]
+    if unavailable:
+        return error_response(f"Files not found or not accessible: {unavailable}", 404)
+
+    order = {file_id: position for position, file_id in enumerate(file_ids)}
+    files = sorted(files, key=lambda f: order[f.id])
+    db.session.close()
+
+    body = stream_zip(get_storage(), files, config['ZIP_CHUNK_SIZE'], prefetch=prefetch)
+    response = current_app.response_class(stream_with_context(body), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(name)}"
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_bp.route('/share', methods=['POST'])
 @jwt_required()
 def share_file():
@@ -242,6 +937,8 @@ def share_file():
     access_level = data.get('access_level', 'read')
     if not file_id or not recipient_email:
         return error_response('Missing file_id or recipient_email', 400)
+    if access_level not in ACCESS_LEVELS:
+        return error_response(f"access_level must be one of: {', '.join(ACCESS_LEVELS)}", 400)
 
     file_obj = File.query.get_or_404(file_id)
     current_user_id = int(get_jwt_identity())
@@ -254,12 +951,16 @@ def share_file():
     if recipient.id == current_user_id:
         return error_response('The recipient already has access to this file', 400)
 
-    existing_share = SharedFile.query.filter_by(file_id=file_id, shared_with_user_id=recipient.id).first()
-    if existing_share:
+    # The unique (file_id, shared_with_user_id) index makes this race-free without a prior existence check
+    result = db.session.execute(
+        dialect_insert(SharedFile).values(
+            file_id=file_id, shared_with_user_id=recipient.id, access_level=access_level
+        ).on_conflict_do_nothing(index_elements=['file_id', 'shared_with_user_id'])
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
         return error_response('The recipient already has access to this file', 400)
-
-    shared_file = SharedFile(file_id=file_id, shared_with_user_id=recipient.id, access_level=access_level)
-    db.session.add(shared_file)
+    bump_files_version([current_user_id, recipient.id])
     db.session.commit()
 
     return success_response('File shared successfully')
@@ -287,10 +988,133 @@ def unshare_file():
         return error_response('User does not have access or it was never shared with them', 404)
 
     db.session.delete(shared_record)
+    bump_files_version([current_user_id, shared_record.shared_with_user_id])
     db.session.commit()
+    invalidate_download_url(file_obj.s3_key)
     return success_response('User has been removed from the file collaboration')
 
 
+def parse_bulk_lists(data, **checks):
+    # Each named field must be a non-empty list whose items all pass its check
+    values = [data.get(name) for name in checks]
+    if any(
+        not isinstance(value, list) or not value or not all(check(item) for item in value)
+        for value, check in zip(values, checks.values())
+    ):
+        return None
+    # Preserve request order while dropping duplicates
+    return [list(dict.fromkeys(value)) for value in values]
+
+
+@api_bp.route('/share/bulk', methods=['POST'])
+@jwt_required()
+def share_files_bulk():
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    lists = parse_bulk_lists(data, file_ids=is_id, recipient_emails=lambda email: isinstance(email, str))
+    if lists is None:
+        return error_response('file_ids and recipient_emails must be non-empty lists of file ids and emails', 400)
+    file_ids, recipient_emails = lists
+    access_level = data.get('access_level', 'read')
+    if access_level not in ACCESS_LEVELS:
+        return error_response(f"access_level must be one of: {', '.join(ACCESS_LEVELS)}", 400)
+    if len(file_ids) * len(recipient_emails) > current_app.config['BULK_SHARE_MAX']:
+        return error_response(f"At most {current_app.config['BULK_SHARE_MAX']} shares per request", 400)
+
+    owned_ids = set(db.session.execute(
+        db.select(File.id).where(File.id.in_(file_ids), File.user_id == current_user_id)
+    ).scalars())
+    recipients = {
+        user.email: user
+        for user in User.query.filter(User.email.in_(recipient_emails)).with_entities(User.id, User.email, User.username)
+    }
+
+    pairs = [
+        (file_id, recipients[email].id)
+        for file_id in file_ids if file_id in owned_ids
+        for email in recipient_emails if email in recipients and recipients[email].id != current_user_id
+    ]
+    inserted = set()
+    if pairs:
+        now = datetime.now(timezone.utc)
+        # One multi-row upsert; RETURNING tells us which pairs were new
+        inserted = set(db.session.execute(
+            dialect_insert(SharedFile).values([
+                {'file_id': file_id, 'shared_with_user_id': user_id, 'access_level': access_level,
+                 'share_timestamp': now}
+                for file_id, user_id in pairs
+            ]).on_conflict_do_nothing(
+                index_elements=['file_id', 'shared_with_user_id']
+            ).returning(SharedFile.file_id, SharedFile.shared_with_user_id)
+        ).all())
+        if inserted:
+            bump_files_version({current_user_id} | {user_id for _, user_id in inserted})
+        db.session.commit()
+
+    results = []
+    for file_id in file_ids:
+        for email in recipient_emails:
+            recipient = recipients.get(email)
+            if file_id not in owned_ids:
+                status = 'not_owner'
+            elif recipient is None:
+                status = 'recipient_not_found'
+            elif recipient.id == current_user_id or (file_id, recipient.id) not in inserted:
+                status = 'already_shared'
+            else:
+                status = 'shared'
+            results.append({
+                'file_id': file_id,
+                'recipient_email': email,
+                'shared_username': recipient.username if recipient else None,
+                'status': status
+            })
+
+    return success_response(f"Created {len(inserted)} share(s)", results=results)
+
+
+@api_bp.route('/unshare/bulk', methods=['POST'])
+@jwt_required()
+def unshare_files_bulk():
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    lists = parse_bulk_lists(data, file_ids=is_id, user_ids=is_id)
+    if lists is None:
+        return error_response('file_ids and user_ids must be non-empty lists of ids', 400)
+    file_ids, user_ids = lists
+    if len(file_ids) * len(user_ids) > current_app.config['BULK_SHARE_MAX']:
+        return error_response(f"At most {current_app.config['BULK_SHARE_MAX']} shares per request", 400)
+
+    owned = dict(db.session.execute(
+        db.select(File.id, File.s3_key).where(File.id.in_(file_ids), File.user_id == current_user_id)
+    ).all())
+    removed = set()
+    if owned:
+        removed = set(db.session.execute(
+            db.delete(SharedFile).where(
+                SharedFile.file_id.in_(owned), SharedFile.shared_with_user_id.in_(user_ids)
+            ).returning(SharedFile.file_id, SharedFile.shared_with_user_id),
+            execution_options={'synchronize_session': False}
+        ).all())
+        if removed:
+            bump_files_version({current_user_id} | {user_id for _, user_id in removed})
+        db.session.commit()
+        for file_id in {file_id for file_id, _ in removed}:
+            invalidate_download_url(owned[file_id])
+
+    results = [{
+        'file_id': file_id,
+        'user_id': user_id,
+        'status': 'not_owner' if file_id not in owned else 'removed' if (file_id, user_id) in removed else 'not_shared'
+    } for file_id in file_ids for user_id in user_ids]
+
+    return success_response(f"Removed {len(removed)} share(s)", results=results)
+
+
 @api_bp.route('/files/<int:file_id>', methods=['DELETE'])
 @jwt_required()
 def delete_file(file_id):
@@ -298,18 +1122,294 @@ def delete_file(file_id):
     file_obj = File.query.get_or_404(file_id)
     if file_obj.user_id != user_id:
         return error_response('You cannot delete a file that you do not own', 403)
-    db.session.delete(file_obj)
+    delete_files([file_obj])
     db.session.commit()
+    invalidate_download_url(file_obj.s3_key)
+    start_garbage_collector()
     return success_response('File deleted successfully')
 
 
+@api_bp.route('/files', methods=['DELETE'])
+@jwt_required()
+def delete_files_bulk():
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    file_ids = data.get('file_ids')
+    if not is_id_list(file_ids):
+        return error_response('file_ids must be a non-empty list of file ids', 400)
+    if len(file_ids) > current_app.config['BULK_DELETE_MAX']:
+        return error_response(f"At most {current_app.config['BULK_DELETE_MAX']} files per request", 400)
+
+    files = File.query.filter(File.id.in_(file_ids), File.user_id == user_id).all()
+    if files:
+        delete_files(files)
+        db.session.commit()
+        for f in files:
+            invalidate_download_url(f.s3_key)
+        start_garbage_collector()
+
+    deleted_ids = {f.id for f in files}
+    return success_response(
+        f"Deleted {len(deleted_ids)} file(s)",
+        deleted=sorted(deleted_ids),
+        not_deleted=[file_id for file_id in file_ids if file_id not in deleted_ids]
+    )
+
+
 @api_bp.route('/files/<int:file_id>/leave', methods=['POST'])
 @jwt_required()
 def leave_collaboration(file_id):
     user_id = int(get_jwt_identity())
     shared_record = SharedFile.query.filter_by(file_id=file_id, shared_with_user_id=user_id).first()
     if not shared_record:
+        group_name = db.session.execute(
+            db.select(Group.name).join(GroupShare, GroupShare.group_id == Group.id).join(
+                GroupMembership, GroupMembership.group_id == Group.id
+            ).where(GroupShare.file_id == file_id, GroupMembership.user_id == user_id).limit(1)
+        ).scalar()
+        if group_name is not None:
+            return error_response(f"This file is shared via group {group_name}; leave the group instead", 400)
         return error_response('You do not have access to this file or it was never shared with you', 404)
     db.session.delete(shared_record)
+    bump_files_version([user_id, shared_record.file.user_id])
     db.session.commit()
     return success_response('You have left the collaboration')
+
+
+def group_for_member(group_id, user_id):
+    # The group, if the user belongs to it; None otherwise so callers answer 404 either way
+    return db.session.execute(
+        db.select(Group).join(GroupMembership, GroupMembership.group_id == Group.id).where(
+            Group.id == group_id, GroupMembership.user_id == user_id
+        )
+    ).scalar()
+
+
+@api_bp.route('/groups', methods=['POST'])
+@jwt_required()
+def create_group():
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    name = data.get('name')
+    name = name.strip() if isinstance(name, str) else ''
+    member_emails = data.get('member_emails', [])
+    if not name or len(name) > 120:
+        return error_response('Group name must be 1-120 characters', 400)
+    if not isinstance(member_emails, list) or not all(isinstance(email, str) for email in member_emails):
+        return error_response('member_emails must be a list of emails', 400)
+    if len(member_emails) > current_app.config['GROUP_MAX_MEMBERS']:
+        return error_response(f"At most {current_app.config['GROUP_MAX_MEMBERS']} members per group", 400)
+
+    members = dict(db.session.execute(
+        db.select(User.email, User.id).where(User.email.in_(member_emails))
+    ).all()) if member_emails else {}
+    group = Group(name=name, owner_id=user_id)
+    db.session.add(group)
+    db.session.flush()
+    # New members have nothing shared with them yet, so no listing versions change
+    db.session.execute(db.insert(GroupMembership), [
+        {'group_id': group.id, 'user_id': member_id} for member_id in {user_id} | set(members.values())
+    ])
+    db.session.commit()
+    return success_response(
+        'Group created', 201, group_id=group.id,
+        not_found=[email for email in member_emails if email not in members]
+    )
+
+
+@api_bp.route('/groups', methods=['GET'])
+@jwt_required()
+@replica_reads
+def list_groups():
+    user_id = int(get_jwt_identity())
+    member_count = db.select(func.count(GroupMembership.id)).where(
+        GroupMembership.group_id == Group.id
+    ).correlate(Group).scalar_subquery()
+    mine = db.select(GroupMembership.group_id).where(GroupMembership.user_id == user_id)
+    rows = db.session.execute(
+        db.select(Group.id, Group.name, Group.owner_id, member_count.label('member_count'))
+        .where(Group.id.in_(mine)).order_by(Group.name, Group.id)
+    ).all()
+    return jsonify({'groups': [{
+        'id': row.id,
+        'name': row.name,
+        'is_owner': row.owner_id == user_id,
+        'member_count': row.member_count
+    } for row in rows]}), 200
+
+
+@api_bp.route('/groups/<int:group_id>', methods=['GET'])
+@jwt_required()
+@replica_reads
+def get_group(group_id):
+    user_id = int(get_jwt_identity())
+    group = group_for_member(group_id, user_id)
+    if group is None:
+        return error_response('Group not found', 404)
+    members = db.session.execute(
+        db.select(User.id, User.username, User.email).join(GroupMembership, GroupMembership.user_id == User.id)
+        .where(GroupMembership.group_id == group_id).order_by(User.username)
+    ).all()
+    return jsonify({
+        'id': group.id,
+        'name': group.name,
+        'owner_id': group.owner_id,
+        'members': [{'id': m.id, 'username': m.username, 'email': m.email} for m in members]
+    }), 200
+
+
+@api_bp.route('/groups/<int:group_id>', methods=['DELETE'])
+@jwt_required()
+def delete_group(group_id):
+    user_id = int(get_jwt_identity())
+    group = db.session.get(Group, group_id)
+    if group is None or group.owner_id != user_id:
+        return error_response('Group not found or you are not its owner', 404)
+
+    shared = db.session.execute(
+        db.select(File.user_id, File.s3_key).join(GroupShare, GroupShare.file_id == File.id)
+        .where(GroupShare.group_id == group_id)
+    ).all()
+    bump_files_version(group_member_ids([group_id]) | {owner_id for owner_id, _ in shared})
+    db.session.execute(db.delete(GroupShare).where(GroupShare.group_id == group_id))
+    db.session.execute(db.delete(GroupMembership).where(GroupMembership.group_id == group_id))
+    db.session.delete(group)
+    db.session.commit()
+    for _, s3_key in shared:
+        invalidate_download_url(s3_key)
+    return success_response('Group deleted')
+
+
+@api_bp.route('/groups/<int:group_id>/members', methods=['POST'])
+@jwt_required()
+def add_group_member(group_id):
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data or not data.get('email') or not isinstance(data['email'], str):
+        return error_response('Missing email', 400)
+    group = db.session.get(Group, group_id)
+    if group is None or group.owner_id != user_id:
+        return error_response('Group not found or you are not its owner', 404)
+    member = User.query.filter_by(email=data['email']).first()
+    if not member:
+        return error_response('User not found', 404)
+
+    # One membership row; every file shared with the group becomes visible through it
+    result = db.session.execute(
+        dialect_insert(GroupMembership).values(group_id=group_id, user_id=member.id)
+        .on_conflict_do_nothing(index_elements=['group_id', 'user_id'])
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return error_response('The user is already a member of this group', 400)
+    bump_files_version([member.id])
+    db.session.commit()
+    return success_response('Member added', 201)
+
+
+@api_bp.route('/groups/<int:group_id>/members/<int:member_id>', methods=['DELETE'])
+@jwt_required()
+def remove_group_member(group_id, member_id):
+    # Owners remove members; members remove themselves to leave the group
+    user_id = int(get_jwt_identity())
+    group = db.session.get(Group, group_id)
+    if group is None or user_id not in (group.owner_id, member_id):
+        return error_response('Group not found or you are not its owner', 404)
+    if member_id == group.owner_id:
+        return error_response('The owner cannot leave the group; delete it instead', 400)
+
+    result = db.session.execute(
+        db.delete(GroupMembership).where(GroupMembership.group_id == group_id, GroupMembership.user_id == member_id)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return error_response('The user is not a member of this group', 404)
+    bump_files_version([member_id])
+    db.session.commit()
+    return success_response('Member removed')
+
+
+@api_bp.route('/share/group', methods=['POST'])
+@jwt_required()
+def share_files_with_group():
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    lists = parse_bulk_lists(data, file_ids=is_id)
+    group_id = data.get('group_id')
+    if lists is None or not is_id(group_id):
+        return error_response('file_ids must be a non-empty list of file ids and group_id a group id', 400)
+    file_ids, = lists
+    access_level = data.get('access_level', 'read')
+    if access_level not in ACCESS_LEVELS:
+        return error_response(f"access_level must be one of: {', '.join(ACCESS_LEVELS)}", 400)
+    if len(file_ids) > current_app.config['BULK_SHARE_MAX']:
+        return error_response(f"At most {current_app.config['BULK_SHARE_MAX']} shares per request", 400)
+    if group_for_member(group_id, current_user_id) is None:
+        return error_response('Group not found', 404)
+
+    owned_ids = set(db.session.execute(
+        db.select(File.id).where(File.id.in_(file_ids), File.user_id == current_user_id)
+    ).scalars())
+    inserted = set()
+    if owned_ids:
+        now = datetime.now(timezone.utc)
+        # One row per file however many members the group has
+        inserted = set(db.session.execute(
+            dialect_insert(GroupShare).values([
+                {'file_id': file_id, 'group_id': group_id, 'access_level': access_level, 'share_timestamp': now}
+                for file_id in owned_ids
+            ]).on_conflict_do_nothing(index_elements=['file_id', 'group_id']).returning(GroupShare.file_id)
+        ).scalars())
+        if inserted:
+            bump_files_version({current_user_id} | group_member_ids([group_id]))
+        db.session.commit()
+
+    results = [{
+        'file_id': file_id,
+        'status': 'not_owner' if file_id not in owned_ids else 'shared' if file_id in inserted else 'already_shared'
+    } for file_id in file_ids]
+    return success_response(f"Shared {len(inserted)} file(s) with the group", results=results)
+
+
+@api_bp.route('/unshare/group', methods=['POST'])
+@jwt_required()
+def unshare_files_with_group():
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True)
+    if not data:
+        return error_response('Invalid JSON input', 400)
+    lists = parse_bulk_lists(data, file_ids=is_id)
+    group_id = data.get('group_id')
+    if lists is None or not is_id(group_id):
+        return error_response('file_ids must be a non-empty list of file ids and group_id a group id', 400)
+    file_ids, = lists
+    if len(file_ids) > current_app.config['BULK_SHARE_MAX']:
+        return error_response(f"At most {current_app.config['BULK_SHARE_MAX']} shares per request", 400)
+
+    owned = dict(db.session.execute(
+        db.select(File.id, File.s3_key).where(File.id.in_(file_ids), File.user_id == current_user_id)
+    ).all())
+    removed = set()
+    if owned:
+        removed = set(db.session.execute(
+            db.delete(GroupShare).where(GroupShare.file_id.in_(owned), GroupShare.group_id == group_id)
+            .returning(GroupShare.file_id),
+            execution_options={'synchronize_session': False}
+        ).scalars())
+        if removed:
+            bump_files_version({current_user_id} | group_member_ids([group_id]))
+        db.session.commit()
+        for file_id in removed:
+            invalidate_download_url(owned[file_id])
+
+    results = [{
+        'file_id': file_id,
+        'status': 'not_owner' if file_id not in owned else 'removed' if file_id in removed else 'not_shared'
+    } for file_id in file_ids]
+    return success_response(f"Removed {len(removed)} file(s) from the group", results=results)
@@ -0,0 +1,59 @@
+# backend/app/search.py
+from sqlalchemy import case, func, literal
+from . import db
+from .models import User, File, SharedFile, GroupMembership, GroupShare
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _matching_files(user_id, pattern):
+    # Owned files and files shared with the user or their groups, each branch narrowed by its
+    # own user index first. On PostgreSQL the planner can also combine it with the filename
+    # trigram index.
+    # SQLite's LIKE already ignores ASCII case, which spares a lower() call per row.
+    if db.engine.dialect.name == 'postgresql':
+        matches = File.filename.ilike(pattern, escape='\\')
+    else:
+        matches = File.filename.like(pattern, escape='\\')
+    columns = (File.id, File.filename, File.size, File.upload_time, User.username.label('owner'))
+    owned = db.select(*columns, literal(True).label('owned')).join(User, User.id == File.user_id).where(
+        File.user_id == user_id, matches
+    )
+    shared = db.select(*columns, literal(False).label('owned')).join(
+        SharedFile, SharedFile.file_id == File.id
+    ).join(User, User.id == File.user_id).where(
+        SharedFile.shared_with_user_id == user_id, File.user_id != user_id, matches
+    )
+    group_shared = db.select(*columns, literal(False).label('owned')).join(
+        GroupShare, GroupShare.file_id == File.id
+    ).join(GroupMembership, GroupMembership.group_id == GroupShare.group_id).join(
+        User, User.id == File.user_id
+    ).where(
+        GroupMembership.user_id == user_id, File.user_id != user_id, matches
+    )
+    # UNION drops files that reach the user both directly and through groups
+    return db.union(owned, shared, group_shared).subquery()
+
+
+def search_files(user_id, query, limit, offset):
+    # Case-insensitive substring search over the files a user can see. Exact names rank
+    # first, then prefixes, then names containing the query, closest matches first.
+    escaped = escape_like(query)
+    matches = _matching_files(user_id, f"%{escaped}%")
+    filename = func.lower(matches.c.filename)
+    match_rank = case(
+        (filename == query.lower(), 0),
+        (filename.like(f"{escaped.lower()}%", escape='\\'), 1),
+        else_=2
+    )
+    if db.engine.dialect.name == 'postgresql':
+        closeness = func.similarity(matches.c.filename, query).desc()
+    else:
+        closeness = func.length(matches.c.filename).asc()
+    return db.session.execute(
+        db.select(matches).order_by(
+            match_rank, closeness, matches.c.upload_time.desc(), matches.c.id.desc()
+        ).limit(limit).offset(offset)
+    ).all()
@@ -0,0 +1,113 @@
+# backend/app/serialization.py
+import gzip
+from datetime import datetime, timezone
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+
+def _utc_isoformat(value):
+    # Stored timestamps are naive UTC; both providers emit them as ISO 8601 with a Z suffix
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    # Flask's provider, with datetimes formatted the way OrjsonProvider formats them
+    @staticmethod
+    def default(o):
+        if isinstance(o, datetime):
+            return _utc_isoformat(o)
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(JSONProvider):
+    # Serializes responses straight to bytes with orjson, which handles datetimes natively
+    mimetype = 'application/json'
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        option = self._options | (self._orjson.OPT_SORT_KEYS if kwargs.get('sort_keys') else 0)
+        return self._orjson.dumps(obj, default=DefaultJSONProvider.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._orjson.dumps(obj, default=DefaultJSONProvider.default, option=self._options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def create_json_provider(app):
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        try:
+            return OrjsonProvider(app)
+        except ImportError:
+            app.logger.warning('JSON_PROVIDER is orjson but orjson is not installed; using the standard library')
+    return StdlibJSONProvider(app)
+
+
+def requested_fields(*field_sets):
+    # Parses ?fields=a,b into the subset of each serializer's field table, or returns None
+    # for an unknown name. Without the parameter every field is returned.
+    fields = request.args.get('fields')
+    if not fields:
+        return field_sets
+    names = [name for name in (part.strip() for part in fields.split(',')) if name]
+    if not names or any(all(name not in field_set for field_set in field_sets) for name in names):
+        return None
+    return tuple({name: field_set[name] for name in names if name in field_set} for field_set in field_sets)
+
+
+def serialize(obj, fields):
+    return {name: get(obj) for name, get in fields.items()}
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress_response(response):
+    # Negotiated gzip/brotli for JSON bodies of at least COMPRESS_MIN_SIZE bytes
+    config = current_app.config
+    if (
+        not config['COMPRESS_ENABLED'] or response.direct_passthrough or response.is_streamed
+        or response.status_code not in (200, 201) or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    brotli = _brotli()
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+    if encoding == 'br':
+        data = brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+    else:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The encoded bytes differ from the identity representation, so its ETag is only weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_serialization(app):
+    app.json = create_json_provider(app)
+    app.after_request(compress_response)
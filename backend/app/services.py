@@ -1,65 +1,556 @@
 # backend/app/services.py
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config as BotoConfig
-from flask import current_app
+from flask import current_app, has_app_context
+from collections import OrderedDict, namedtuple
+import hashlib
+import os
 import random, string
-import smtplib
-from email.message import EmailMessage
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from urllib.parse import quote
+from sqlalchemy import event, or_
+from . import db
+from .metrics import timed_call, s3_operation_duration
+from .models import OutboundEmail, User, Blob, File, SharedFile, GroupMembership, GroupShare, StorageTombstone, \
+    dialect_insert
 
 
-def get_s3_client():
-    aws_access_key = current_app.config.get('AWS_ACCESS_KEY')
-    aws_secret_key = current_app.config.get('AWS_SECRET_KEY')
+_s3_client_lock = threading.Lock()
+_s3_clients = {}
+
+
+def _reset_s3_clients():
+    # A forked worker must not reuse the parent's sockets or a lock held at fork time
+    global _s3_client_lock
+    _s3_client_lock = threading.Lock()
+    _s3_clients.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_s3_clients)
+
+
+def _s3_client_settings():
+    config = current_app.config
+    return (
+        config.get('AWS_ACCESS_KEY'),
+        config.get('AWS_SECRET_KEY'),
+        config['AWS_REGION'],
+        config.get('AWS_S3_ENDPOINT_URL') or f"https://s3.{config['AWS_REGION']}.amazonaws.com",
+        config['S3_MAX_POOL_CONNECTIONS'],
+        config['S3_TCP_KEEPALIVE'],
+        config['S3_RETRY_MODE'],
+        config['S3_MAX_ATTEMPTS'],
+    )
+
+
+def create_s3_client(settings=None):
+    aws_access_key, aws_secret_key, region, endpoint_url, max_pool_connections, tcp_keepalive, retry_mode, \
+        max_attempts = settings or _s3_client_settings()
     if not aws_access_key or not aws_secret_key:
         raise ValueError("AWS credentials are not properly configured.")
     s3_config = BotoConfig(
         signature_version='s3v4',
         connect_timeout=30,
-        read_timeout=120
+        read_timeout=120,
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+        retries={'mode': retry_mode, 'max_attempts': max_attempts}
     )
-    return boto3.client(
+    # A private session keeps client creation off boto3's shared default session,
+    # which is not thread-safe.
+    session = boto3.session.Session()
+    return session.client(
         's3',
-        region_name=current_app.config['AWS_REGION'],
+        region_name=region,
         aws_access_key_id=aws_access_key,
         aws_secret_access_key=aws_secret_key,
         config=s3_config,
-        endpoint_url = f"https://s3.{current_app.config['AWS_REGION']}.amazonaws.com"
+        endpoint_url=endpoint_url
     )
 
 
-def upload_file_to_s3(file_obj, s3_key):
-    s3_client = get_s3_client()
+def get_s3_client():
+    # One client per process and configuration; boto3 clients are thread-safe once built.
+    # Changing any setting produces a new cache key, which drops the old client.
+    settings = _s3_client_settings()
+    client = _s3_clients.get(settings)
+    if client is None:
+        with _s3_client_lock:
+            client = _s3_clients.get(settings)
+            if client is None:
+                client = create_s3_client(settings)
+                _s3_clients.clear()
+                _s3_clients[settings] = client
+    return client
+
+
+def get_bucket_name():
     bucket_name = current_app.config.get('AWS_S3_BUCKET')
     if not bucket_name:
         raise ValueError("AWS S3 bucket name is not set in configuration.")
-    s3_client.upload_fileobj(file_obj, bucket_name, s3_key)
+    return bucket_name
+
+
+def get_transfer_config():
+    config = current_app.config
+    part_size = config['MULTIPART_PART_SIZE']
+    # Each in-flight part is buffered in memory, so the memory ceiling caps concurrency
+    max_concurrency = max(1, min(config['S3_TRANSFER_MAX_CONCURRENCY'], config['S3_TRANSFER_MAX_MEMORY'] // part_size))
+    return TransferConfig(
+        multipart_threshold=config['MULTIPART_THRESHOLD'],
+        multipart_chunksize=part_size,
+        max_concurrency=max_concurrency,
+        use_threads=max_concurrency > 1
+    )
+
+
+@timed_call(s3_operation_duration, operation='upload')
+def upload_file_to_s3(file_obj, s3_key):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    s3_client.upload_fileobj(file_obj, bucket_name, s3_key, Config=get_transfer_config())
     return True
 
 
-def generate_presigned_url(s3_key, expiration=3600):
+@timed_call(s3_operation_duration, operation='presign_get')
+def generate_presigned_url(s3_key, expiration=3600, filename=None):
     s3_client = get_s3_client()
-    bucket_name = current_app.config.get('AWS_S3_BUCKET')
-    if not bucket_name:
-        raise ValueError("AWS S3 bucket name is not set in configuration.")
+    bucket_name = get_bucket_name()
+    params = {'Bucket': bucket_name, 'Key': s3_key}
+    if filename:
+        # Content-addressed keys carry no filename, so name the download explicitly
+        params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
     return s3_client.generate_presigned_url(
         ClientMethod='get_object',
-        Params={'Bucket': bucket_name, 'Key': s3_key},
+        Params=params,
         ExpiresIn=expiration
     )
 
 
+# LRU cache of download URLs keyed by (storage key, download filename), local to the worker process
+class PresignedUrlCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._filenames_by_key = {}
+        self._lock = threading.Lock()
+
+    def get(self, s3_key, filename, min_remaining):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((s3_key, filename))
+            if entry is None:
+                return None
+            url, issued_at, expires_at = entry
+            if expires_at - now <= (expires_at - issued_at) * min_remaining:
+                self._remove((s3_key, filename))
+                return None
+            self._entries.move_to_end((s3_key, filename))
+            return url
+
+    def set(self, s3_key, filename, url, expiration):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[(s3_key, filename)] = (url, now, now + expiration)
+            self._entries.move_to_end((s3_key, filename))
+            self._filenames_by_key.setdefault(s3_key, set()).add(filename)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, s3_key):
+        with self._lock:
+            for filename in self._filenames_by_key.pop(s3_key, ()):
+                self._entries.pop((s3_key, filename), None)
+
+    def _remove(self, cache_key):
+        del self._entries[cache_key]
+        s3_key, filename = cache_key
+        filenames = self._filenames_by_key.get(s3_key)
+        if filenames is not None:
+            filenames.discard(filename)
+            if not filenames:
+                del self._filenames_by_key[s3_key]
+
+
+# What authenticated requests need to know about the caller; safe to share between threads
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'email'])
+
+
+class UserCache:
+    # Bounded LRU of CachedUser by id. Entries expire after ttl seconds, which bounds how long
+    # another process can serve a user changed elsewhere; changes made here invalidate at once.
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def load_user(user_id):
+    cache = current_app.extensions['user_cache']
+    user = cache.get(user_id)
+    if user is None:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.email).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        cache.set(user)
+    return user
+
+
+def load_jwt_user(jwt_header, jwt_data):
+    # user_lookup_loader for flask_jwt_extended; a token for a user that no longer exists is rejected
+    try:
+        return load_user(int(jwt_data['sub']))
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    if has_app_context():
+        current_app.extensions['user_cache'].invalidate(target.id)
+
+
+def get_download_url(s3_key, filename=None):
+    config = current_app.config
+    cache = current_app.extensions['presigned_url_cache']
+    url = cache.get(s3_key, filename, config['PRESIGNED_URL_MIN_REMAINING'])
+    if url is None:
+        expiration = config['PRESIGNED_URL_EXPIRATION']
+        url = current_app.extensions['storage'].download_url(s3_key, filename, expiration)
+        cache.set(s3_key, filename, url, expiration)
+    return url
+
+
+def invalidate_download_url(s3_key):
+    current_app.extensions['presigned_url_cache'].invalidate(s3_key)
+
+
+@timed_call(s3_operation_duration, operation='presign_post')
+def generate_presigned_post(s3_key, max_size, expiration=3600):
+    # The browser POSTs the file straight to S3; the size condition stops it
+    # from uploading more than it declared in upload-initiate.
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    return s3_client.generate_presigned_post(
+        Bucket=bucket_name,
+        Key=s3_key,
+        Conditions=[['content-length-range', 0, max_size]],
+        ExpiresIn=expiration
+    )
+
+
+@timed_call(s3_operation_duration, operation='create_multipart_upload')
+def create_presigned_multipart_upload(s3_key, part_count, expiration=3600):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key)['UploadId']
+    part_urls = presign_upload_parts(s3_key, upload_id, range(1, part_count + 1), expiration)
+    return upload_id, part_urls
+
+
+@timed_call(s3_operation_duration, operation='presign_upload_parts')
+def presign_upload_parts(s3_key, upload_id, part_numbers, expiration=3600):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    return [{
+        'part_number': part_number,
+        'url': s3_client.generate_presigned_url(
+            ClientMethod='upload_part',
+            Params={'Bucket': bucket_name, 'Key': s3_key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expiration
+        )
+    } for part_number in part_numbers]
+
+
+@timed_call(s3_operation_duration, operation='list_parts')
+def list_uploaded_parts(s3_key, upload_id):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    paginator = s3_client.get_paginator('list_parts')
+    return [
+        {'part_number': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']}
+        for page in paginator.paginate(Bucket=bucket_name, Key=s3_key, UploadId=upload_id)
+        for part in page.get('Parts', [])
+    ]
+
+
+@timed_call(s3_operation_duration, operation='complete_multipart_upload')
+def complete_multipart_upload(s3_key, upload_id, parts):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    s3_client.complete_multipart_upload(
+        Bucket=bucket_name,
+        Key=s3_key,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': int(p['part_number']), 'ETag': p['etag']}
+            for p in sorted(parts, key=lambda p: int(p['part_number']))
+        ]}
+    )
+
+
+@timed_call(s3_operation_duration, operation='abort_multipart_upload')
+def abort_multipart_upload(s3_key, upload_id):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    s3_client.abort_multipart_upload(Bucket=bucket_name, Key=s3_key, UploadId=upload_id)
+
+
+@timed_call(s3_operation_duration, operation='delete_objects')
+def delete_s3_objects(s3_keys):
+    # DeleteObjects takes at most 1000 keys per call
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    errors = {}
+    for start in range(0, len(s3_keys), 1000):
+        response = s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [{'Key': key} for key in s3_keys[start:start + 1000]], 'Quiet': True}
+        )
+        for error in response.get('Errors', []):
+            errors[error['Key']] = error.get('Message', error.get('Code'))
+    return errors
+
+
+@timed_call(s3_operation_duration, operation='get_object')
+def open_s3_object(s3_key):
+    # The body is streamed from the open response; read it in chunks and close it
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    return s3_client.get_object(Bucket=bucket_name, Key=s3_key)['Body']
+
+
+@timed_call(s3_operation_duration, operation='head_object')
+def get_object_size(s3_key):
+    s3_client = get_s3_client()
+    bucket_name = get_bucket_name()
+    return s3_client.head_object(Bucket=bucket_name, Key=s3_key)['ContentLength']
+
+
+def hash_stream(stream, chunk_size=1024 * 1024):
+    # Size and SHA-256 in one pass over fixed-size chunks, then rewind for the upload
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+
+def blob_s3_key(sha256):
+    return f"blobs/{sha256}"
+
+
+def acquire_blob(sha256, size):
+    # Insert the blob or bump its reference count in one statement, so concurrent
+    # uploads of the same content cannot race each other. Returns (id, ref_count).
+    s3_key = blob_s3_key(sha256)
+    stmt = dialect_insert(Blob).values(
+        sha256=sha256, s3_key=s3_key, size=size, ref_count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['sha256'],
+        set_={'ref_count': Blob.ref_count + 1}
+    ).returning(Blob.id, Blob.ref_count)
+    blob_id, ref_count = db.session.execute(stmt).one()
+    # Withdraw any pending deletion of the object. The collector holds its tombstones locked
+    # until it has deleted their objects, so this waits for a delete in progress to finish.
+    # A caller that gets ref_count 1 checks the object is still there once it has committed.
+    db.session.execute(
+        db.delete(StorageTombstone).where(StorageTombstone.s3_key == s3_key),
+        execution_options={'synchronize_session': False}
+    )
+    return blob_id, ref_count
+
+
+def delete_files(files):
+    # Deletes the given File rows, their shares and their blob references in a
+    # constant number of statements, and queues every object that lost its last
+    # reference for the garbage collector. The caller commits.
+    file_ids = [f.id for f in files]
+    blob_ids = {f.blob_id for f in files if f.blob_id}
+
+    if blob_ids:
+        released = db.select(db.func.count(File.id)).where(
+            File.blob_id == Blob.id, File.id.in_(file_ids)
+        ).scalar_subquery()
+        db.session.execute(
+            db.update(Blob).where(Blob.id.in_(blob_ids)).values(ref_count=Blob.ref_count - released),
+            execution_options={'synchronize_session': False}
+        )
+
+    recipient_ids = db.session.execute(
+        db.delete(SharedFile).where(SharedFile.file_id.in_(file_ids)).returning(SharedFile.shared_with_user_id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    group_ids = db.session.execute(
+        db.delete(GroupShare).where(GroupShare.file_id.in_(file_ids)).returning(GroupShare.group_id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    bump_files_version({f.user_id for f in files} | set(recipient_ids) | group_member_ids(group_ids))
+    sizes_by_user = {}
+    for f in files:
+        sizes_by_user[f.user_id] = sizes_by_user.get(f.user_id, 0) + (f.size or 0)
+    release_storage(sizes_by_user)
+    db.session.execute(
+        db.delete(File).where(File.id.in_(file_ids)),
+        execution_options={'synchronize_session': False}
+    )
+
+    orphaned_keys = [f.s3_key for f in files if not f.blob_id]
+    if blob_ids:
+        orphaned_keys += db.session.execute(
+            db.delete(Blob).where(Blob.id.in_(blob_ids), Blob.ref_count <= 0).returning(Blob.s3_key),
+            execution_options={'synchronize_session': False}
+        ).scalars().all()
+
+    discard_stored_objects(orphaned_keys)
+
+    for f in files:
+        db.session.expunge(f)
+    return orphaned_keys
+
+
+def discard_stored_objects(keys):
+    # Queues objects for the garbage collector in the caller's transaction, to be deleted once
+    # the grace period has passed. An upload that acquires the blob again removes its
+    # tombstone first (see acquire_blob), so the grace period only delays reclaiming space.
+    collect_after = datetime.now(timezone.utc) + timedelta(seconds=current_app.config['GC_GRACE_PERIOD'])
+    db.session.add_all(StorageTombstone(s3_key=key, next_attempt_at=collect_after) for key in keys)
+
+
+def accessible_files_filter(user_id):
+    # Files the user owns, files shared with them directly and files shared with one of
+    # their groups; the group branch is a single join through the membership index
+    return or_(
+        File.user_id == user_id,
+        File.shared_with.any(SharedFile.shared_with_user_id == user_id),
+        db.select(GroupShare.id).join(GroupMembership, GroupMembership.group_id == GroupShare.group_id).where(
+            GroupShare.file_id == File.id, GroupMembership.user_id == user_id
+        ).exists()
+    )
+
+
+def group_member_ids(group_ids):
+    group_ids = set(group_ids)
+    if not group_ids:
+        return set()
+    return set(db.session.execute(
+        db.select(GroupMembership.user_id).where(GroupMembership.group_id.in_(group_ids))
+    ).scalars())
+
+
+def bump_files_version(user_ids):
+    # Invalidates the listing ETags of these users; runs in the caller's transaction
+    user_ids = {int(user_id) for user_id in user_ids}
+    if user_ids:
+        db.session.execute(
+            db.update(User).where(User.id.in_(user_ids)).values(files_version=User.files_version + 1),
+            execution_options={'synchronize_session': False}
+        )
+
+
+def _storage_quota():
+    return db.func.coalesce(User.storage_quota, current_app.config['DEFAULT_STORAGE_QUOTA'])
+
+
+def storage_remaining(user_id):
+    # Bytes the user may still upload, or None when unlimited
+    row = db.session.execute(
+        db.select(User.storage_used, _storage_quota()).where(User.id == int(user_id))
+    ).first()
+    if row is None:
+        return 0
+    used, quota = row
+    return None if not quota else max(quota - used, 0)
+
+
+def charge_storage(user_id, size):
+    # Adds size bytes to the user's usage in the caller's transaction. The quota check and
+    # the increment are one UPDATE, so concurrent uploads cannot both slip under the limit.
+    # Returns False, changing nothing, when the upload does not fit.
+    quota = _storage_quota()
+    result = db.session.execute(
+        db.update(User).where(
+            User.id == int(user_id),
+            or_(quota == 0, User.storage_used + size <= quota)
+        ).values(storage_used=User.storage_used + size),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount == 1
+
+
+def release_storage(sizes_by_user):
+    for user_id, size in sizes_by_user.items():
+        if size:
+            db.session.execute(
+                db.update(User).where(User.id == user_id).values(storage_used=User.storage_used - size),
+                execution_options={'synchronize_session': False}
+            )
+
+
+def start_garbage_collector():
+    if current_app.config['GC_WORKER_ENABLED']:
+        current_app.extensions['garbage_collector'].start()
+
+
+def start_verification_sweeper():
+    if current_app.config['VERIFICATION_SWEEP_ENABLED']:
+        current_app.extensions['verification_sweeper'].start()
+
+
 def generate_code(length=6):
     return ''.join(random.choices(string.digits, k=length))
 
 
+def queue_email(to_email, subject, body):
+    # The request only writes the queue row; EmailWorker does the SMTP work.
+    email = OutboundEmail(to_email=to_email, subject=subject, body=body)
+    db.session.add(email)
+    db.session.commit()
+    if current_app.config['EMAIL_WORKER_ENABLED']:
+        worker = current_app.extensions['email_worker']
+        worker.start()
+        worker.notify()
+    return email
+
+
 def send_verification_email(to_email, code):
-    msg = EmailMessage()
-    msg['Subject'] = 'Your Verification Code'
-    msg['From'] = current_app.config['EMAIL_SENDER']
-    msg['To'] = to_email
-    msg.set_content(f"Your verification code is: {code}")
-    # Example with SMTP—configure in your .env and Config
-    with smtplib.SMTP(current_app.config['SMTP_HOST'], current_app.config['SMTP_PORT']) as smtp:
-        smtp.starttls()
-        smtp.login(current_app.config['SMTP_USER'], current_app.config['SMTP_PASS'])
-        smtp.send_message(msg)
\ No newline at end of file
+    return queue_email(to_email, 'Your Verification Code', f"Your verification code is: {code}")
@@ -0,0 +1,146 @@
+# backend/app/storage.py
+import os
+import shutil
+import tempfile
+import time
+from flask import current_app, url_for, send_file, Response
+from itsdangerous import URLSafeSerializer, BadSignature
+from urllib.parse import quote
+from werkzeug.security import safe_join
+from .services import upload_file_to_s3, generate_presigned_url, get_object_size, delete_s3_objects, \
+    open_s3_object
+
+
+class StorageBackend:
+    # Whether clients can upload straight to the store via /upload/initiate
+    supports_direct_upload = False
+
+    def save(self, file_obj, key):
+        raise NotImplementedError
+
+    def download_url(self, key, filename, expiration):
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def open(self, key):
+        # A readable binary stream of the stored object
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        # Returns {key: error message} for keys that could not be deleted
+        raise NotImplementedError
+
+
+class S3Storage(StorageBackend):
+    supports_direct_upload = True
+
+    def save(self, file_obj, key):
+        upload_file_to_s3(file_obj, key)
+
+    def download_url(self, key, filename, expiration):
+        return generate_presigned_url(key, expiration, filename)
+
+    def size(self, key):
+        return get_object_size(key)
+
+    def open(self, key):
+        return open_s3_object(key)
+
+    def delete_many(self, keys):
+        return delete_s3_objects(keys)
+
+
+class LocalStorage(StorageBackend):
+    # Files live under a root directory. Download URLs are signed, expiring links
+    # to /api/storage/<token>, which the web server can serve directly via
+    # X-Accel-Redirect or Werkzeug streams with sendfile and Range support.
+
+    def __init__(self, root, secret_key, chunk_size, accel_redirect_prefix=None):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self.accel_redirect_prefix = accel_redirect_prefix
+        self._signer = URLSafeSerializer(secret_key, salt='local-storage-download')
+
+    def path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, file_obj, key):
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file beside the target and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(file_obj, out, self.chunk_size)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def download_url(self, key, filename, expiration):
+        token = self._signer.dumps({'k': key, 'f': filename, 'e': int(time.time()) + expiration})
+        return url_for('api_bp.storage_download', token=token)
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete_many(self, keys):
+        errors = {}
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as ex:
+                errors[key] = str(ex)
+        return errors
+
+    def load_token(self, token):
+        try:
+            payload = self._signer.loads(token)
+        except BadSignature:
+            return None
+        if payload['e'] < time.time():
+            return None
+        return payload['k'], payload['f']
+
+    def send(self, key, filename):
+        if self.accel_redirect_prefix:
+            # nginx serves the file from an internal location, including Range requests
+            response = Response()
+            response.headers['X-Accel-Redirect'] = self.accel_redirect_prefix.rstrip('/') + '/' + quote(key)
+            if filename:
+                response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+            return response
+        # conditional=True answers Range/If-* requests; the body goes out through
+        # wsgi.file_wrapper, which gunicorn implements with sendfile.
+        return send_file(
+            self.path(key), as_attachment=True, download_name=filename or os.path.basename(key), conditional=True
+        )
+
+
+def create_storage(app):
+    backend = app.config['STORAGE_BACKEND']
+    if backend == 's3':
+        return S3Storage()
+    if backend == 'local':
+        return LocalStorage(
+            app.config['LOCAL_STORAGE_PATH'],
+            app.config['SECRET_KEY'],
+            app.config['LOCAL_STORAGE_CHUNK_SIZE'],
+            app.config['LOCAL_STORAGE_ACCEL_REDIRECT']
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_storage():
+    return current_app.extensions['storage']
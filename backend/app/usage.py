@@ -0,0 +1,72 @@
+# backend/app/usage.py
+from flask import current_app
+from . import db
+from .models import User, File, Blob
+from .storage import get_storage
+
+
+def repair_file_sizes(batch_size):
+    # Older uploads were recorded with size 0. Deduplicated files take the size of their
+    # blob in one statement; the rest are looked up in storage a batch at a time.
+    repaired = db.session.execute(
+        db.update(File).where(File.size == 0, File.blob_id.is_not(None)).values(
+            size=db.select(Blob.size).where(Blob.id == File.blob_id).scalar_subquery()
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    db.session.commit()
+
+    storage = get_storage()
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            db.select(File.id, File.s3_key).where(File.size == 0, File.blob_id.is_(None), File.id > last_id)
+            .order_by(File.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for file_id, s3_key in batch:
+            try:
+                size = storage.size(s3_key)
+            except Exception as ex:
+                current_app.logger.warning(f"Could not read the size of {s3_key}: {ex}")
+                continue
+            if size:
+                db.session.execute(
+                    db.update(File).where(File.id == file_id).values(size=size),
+                    execution_options={'synchronize_session': False}
+                )
+                repaired += 1
+        db.session.commit()
+    return repaired
+
+
+def reconcile_storage_usage(batch_size):
+    # Recomputes storage_used from file sizes for users in id ranges of batch_size. Each batch is
+    # a single UPDATE that only touches rows that drifted, so it holds locks briefly and can run
+    # while uploads continue. Returns (users checked, users repaired).
+    checked = repaired = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            db.select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        actual = db.select(db.func.coalesce(db.func.sum(File.size), 0)).where(
+            File.user_id == User.id
+        ).scalar_subquery()
+        result = db.session.execute(
+            db.update(User).where(User.id.between(ids[0], ids[-1]), User.storage_used != actual)
+            .values(storage_used=actual),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        checked += len(ids)
+        repaired += result.rowcount
+        last_id = ids[-1]
+
+    if repaired:
+        current_app.logger.warning(f"Storage usage reconciliation repaired {repaired} of {checked} users")
+    return checked, repaired
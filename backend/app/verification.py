@@ -0,0 +1,61 @@
+# backend/app/verification.py
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from . import db
+from .metrics import verification_sweep_rows, verification_sweep_runs
+from .models import EmailVerification
+from .workers import BackgroundWorker
+
+
+def sweep_expired_verifications(max_batches=None):
+    # Deletes expired registrations in batches of VERIFICATION_SWEEP_BATCH_SIZE rows,
+    # each picked through the expires_at index and committed on its own so locks stay short.
+    batch_size = current_app.config['VERIFICATION_SWEEP_BATCH_SIZE']
+    now = datetime.now(timezone.utc)
+    started = time.monotonic()
+    report = {'swept': 0, 'batches': 0}
+
+    while max_batches is None or report['batches'] < max_batches:
+        expired_ids = db.select(EmailVerification.id).where(
+            EmailVerification.expires_at < now
+        ).order_by(EmailVerification.expires_at).limit(batch_size).scalar_subquery()
+        result = db.session.execute(
+            db.delete(EmailVerification).where(EmailVerification.id.in_(expired_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        report['batches'] += 1
+        report['swept'] += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    report['duration'] = time.monotonic() - started
+    verification_sweep_runs.inc()
+    verification_sweep_rows.inc(report['swept'])
+    if report['swept']:
+        current_app.logger.info(
+            f"Swept {report['swept']} expired email verifications in {report['batches']} batches "
+            f"({report['duration']:.3f}s)"
+        )
+    return report
+
+
+class VerificationSweeper(BackgroundWorker):
+    name = 'verification-sweeper'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.stats = {'runs': 0, 'swept_total': 0, 'last_swept': 0, 'last_run_at': None}
+
+    def poll_interval(self):
+        return self.app.config['VERIFICATION_SWEEP_INTERVAL']
+
+    def run_once(self):
+        report = sweep_expired_verifications()
+        self.stats['runs'] += 1
+        self.stats['swept_total'] += report['swept']
+        self.stats['last_swept'] = report['swept']
+        self.stats['last_run_at'] = datetime.now(timezone.utc)
+        # Always wait for the next interval; a single run already drains every expired row
+        return 0
@@ -0,0 +1,50 @@
+# backend/app/workers.py
+import threading
+from . import db
+
+
+class BackgroundWorker:
+    # A daemon thread that calls run_once() inside an app context for as long as it
+    # finds work, then sleeps for poll_interval() seconds or until notify() is called.
+    name = 'worker'
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def run_forever(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    done = self.run_once()
+                except Exception:
+                    self.app.logger.error(f"Error in {self.name}", exc_info=True)
+                    db.session.rollback()
+                    done = 0
+                finally:
+                    db.session.remove()
+
+                if not done:
+                    self._wakeup.wait(self.poll_interval())
+                    self._wakeup.clear()
+                    self.on_idle()
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def poll_interval(self):
+        raise NotImplementedError
+
+    def on_idle(self):
+        pass
@@ -0,0 +1,308 @@
+# backend/benchmarks/bench_api.py
+#
+# End-to-end API benchmark. Boots create_app() against SQLite (default) or PostgreSQL,
+# an in-process moto S3 server and an aiosmtpd sink, seeds users, files and shares,
+# then drives /login, /files, /files/search, /upload, /download/<id> and /share from concurrent
+# clients and reports requests/sec with p50/p99 latency. Results can be written as
+# JSON and compared against an earlier run.
+#
+#   cd backend && python -m benchmarks.bench_api --users 200 --files-per-user 20 --output before.json
+#   cd backend && python -m benchmarks.bench_api --users 200 --files-per-user 20 --compare before.json
+#   cd backend && python -m benchmarks.bench_api --users 1000 --files-per-user 1000 --endpoints search
+#
+# A PostgreSQL database is only written to when it is empty, or when --reset is given,
+# which drops every table first.
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ENDPOINTS = ('login', 'files', 'search', 'upload', 'download', 'share')
+# Seeded filenames are built from these so searches match a realistic share of each user's files
+WORDS = (
+    'report', 'invoice', 'budget', 'photo', 'scan', 'contract', 'draft', 'summary', 'notes', 'backup',
+    'archive', 'slides', 'meeting', 'design', 'resume', 'payroll', 'receipt', 'project', 'roadmap', 'minutes'
+)
+EXTENSIONS = ('pdf', 'docx', 'xlsx', 'png', 'jpg', 'zip', 'txt', 'csv')
+PASSWORD = 'bench-password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='Defaults to a temporary SQLite file.')
+    parser.add_argument('--reset', action='store_true', help='Drop all tables of --database-url before seeding.')
+    parser.add_argument('--s3-endpoint-url', help='Use an existing S3-compatible endpoint instead of moto.')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--files-per-user', type=int, default=20)
+    parser.add_argument('--shares-per-user', type=int, default=10)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint.')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients per endpoint.')
+    parser.add_argument('--upload-size', type=int, default=64 * 1024, help='Bytes per uploaded file.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    parser.add_argument('--compare', help='Print the change against an earlier JSON result file.')
+    return parser.parse_args()
+
+
+def start_s3():
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # moto logs every request otherwise
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def start_smtp_sink():
+    # Accepts and discards every message, with AUTH so the email worker can log in
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import AuthResult
+    except ImportError:
+        return None
+
+    class Sink:
+        async def handle_DATA(self, server, session, envelope):
+            return '250 OK'
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    controller = Controller(
+        Sink(), hostname='127.0.0.1', port=port, auth_require_tls=False,
+        authenticator=lambda *args: AuthResult(success=True)
+    )
+    controller.start()
+    return controller
+
+
+def configure_environment(args, tmp, s3_endpoint, smtp):
+    os.environ.update({
+        'SECRET_KEY': 'bench', 'JWT_SECRET_KEY': 'bench-secret-key-that-is-long-enough',
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        'AWS_ACCESS_KEY': 'bench', 'AWS_SECRET_KEY': 'bench', 'AWS_S3_BUCKET': 'bench', 'AWS_REGION': 'us-east-1',
+        'AWS_S3_ENDPOINT_URL': s3_endpoint, 'STORAGE_BACKEND': 's3',
+        'SMTP_HOST': '127.0.0.1', 'SMTP_USER': 'bench', 'SMTP_PASS': 'bench', 'EMAIL_SENDER': 'bench@localhost',
+        'SMTP_STARTTLS': 'false', 'RATE_LIMIT_ENABLED': 'false', 'SLOW_REQUEST_THRESHOLD': '3600',
+    })
+    if smtp is not None:
+        os.environ['SMTP_PORT'] = str(smtp.port)
+    else:
+        os.environ['EMAIL_WORKER_ENABLED'] = 'false'
+
+
+def seed(app, args, rng):
+    from app import db
+    from app.models import User, File, SharedFile
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        if db.session.execute(db.select(User.id).limit(1)).first() is not None:
+            sys.exit('The database already has users; use an empty database or pass --reset')
+
+        # One hash shared by every seeded user keeps seeding fast
+        password_hash = generate_password_hash(PASSWORD)
+        db.session.execute(db.insert(User), [
+            {'username': f"user{i}", 'email': f"user{i}@bench.local", 'password_hash': password_hash}
+            for i in range(args.users)
+        ])
+        users = db.session.execute(db.select(User.id, User.username, User.email).order_by(User.id)).all()
+
+        # Inserted a user at a time so a million-row dataset does not have to fit in memory
+        for user in users:
+            db.session.execute(db.insert(File), [{
+                'user_id': user.id, 's3_key': f"{user.id}/seed-{n}.bin", 'size': 1024,
+                'filename': f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{n}.{rng.choice(EXTENSIONS)}"
+            } for n in range(args.files_per_user)])
+        files_by_user = {}
+        for file_id, user_id in db.session.execute(db.select(File.id, File.user_id)):
+            files_by_user.setdefault(user_id, []).append(file_id)
+
+        shares = set()
+        for user in users:
+            owned = files_by_user.get(user.id)
+            if not owned or len(users) < 2:
+                continue
+            for _ in range(args.shares_per_user):
+                recipient = rng.choice(users)
+                if recipient.id != user.id:
+                    shares.add((rng.choice(owned), recipient.id))
+        if shares:
+            db.session.execute(db.insert(SharedFile), [
+                {'file_id': file_id, 'shared_with_user_id': user_id, 'access_level': 'read'}
+                for file_id, user_id in shares
+            ])
+        db.session.commit()
+
+        tokens = {
+            user.id: create_access_token(
+                identity=str(user.id), additional_claims={'username': user.username, 'email': user.email}
+            )
+            for user in users
+        }
+    return users, files_by_user, tokens
+
+
+def make_requests(name, users, files_by_user, tokens, args, rng):
+    # Yields (method, path, kwargs) tuples; all randomness is drawn up front so runs repeat
+    owners = [user for user in users if files_by_user.get(user.id)]
+    for i in range(args.requests):
+        user = rng.choice(owners or users)
+        headers = {'Authorization': f"Bearer {tokens[user.id]}"}
+        if name == 'login':
+            yield 'POST', '/api/login', {'json': {'identifier': user.username, 'password': PASSWORD}}
+        elif name == 'files':
+            yield 'GET', '/api/files', {'headers': headers}
+        elif name == 'search':
+            term = rng.choice([rng.choice(WORDS), rng.choice(WORDS)[:3], f"{rng.choice(WORDS)}-{rng.choice(WORDS)}",
+                               str(rng.randrange(args.files_per_user))])
+            yield 'GET', '/api/files/search', {'headers': headers, 'query_string': {'q': term}}
+        elif name == 'upload':
+            content = rng.randbytes(args.upload_size)
+            yield 'POST', '/api/upload', {
+                'headers': headers, 'content_type': 'multipart/form-data',
+                'data': {'file': (content, f"bench-{i}.bin")}
+            }
+        elif name == 'download':
+            yield 'GET', f"/api/download/{rng.choice(files_by_user[user.id])}", {'headers': headers}
+        elif name == 'share':
+            recipient = rng.choice(users)
+            yield 'POST', '/api/share', {'headers': headers, 'json': {
+                'file_id': rng.choice(files_by_user[user.id]), 'recipient_email': recipient.email,
+                'access_level': 'read'
+            }}
+
+
+def run_endpoint(app, requests, clients):
+    pending = list(requests)
+    lock = threading.Lock()
+    timings = []
+    statuses = {}
+
+    def client_loop():
+        client = app.test_client()
+        while True:
+            with lock:
+                if not pending:
+                    return
+                method, path, kwargs = pending.pop()
+            if 'data' in kwargs:
+                content, filename = kwargs['data']['file']
+                kwargs = dict(kwargs, data={'file': (io.BytesIO(content), filename)})
+            start = time.perf_counter()
+            status = client.open(path, method=method, **kwargs).status_code
+            elapsed = time.perf_counter() - start
+            with lock:
+                timings.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'rps': len(timings) / elapsed,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, previous):
+    for name, result in results.items():
+        before = previous.get('results', {}).get(name)
+        if not before:
+            continue
+        print(f"{name:<9} rps {before['rps']:8.1f} -> {result['rps']:8.1f} "
+              f"({(result['rps'] / before['rps'] - 1) * 100:+.1f}%)  "
+              f"p99 {before['p99_ms']:8.2f}ms -> {result['p99_ms']:8.2f}ms")
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    s3_server, s3_endpoint = (None, args.s3_endpoint_url) if args.s3_endpoint_url else start_s3()
+    smtp = start_smtp_sink()
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        configure_environment(args, tmp.name, s3_endpoint, smtp)
+        from app import create_app, db
+        from app.services import get_s3_client
+
+        app = create_app()
+        with app.app_context():
+            client = get_s3_client()
+            try:
+                client.create_bucket(Bucket=app.config['AWS_S3_BUCKET'])
+            except (client.exceptions.BucketAlreadyOwnedByYou, client.exceptions.BucketAlreadyExists):
+                pass
+            dialect = db.engine.dialect.name
+
+        seed_start = time.perf_counter()
+        users, files_by_user, tokens = seed(app, args, rng)
+        print(f"Seeded {len(users)} users, {sum(map(len, files_by_user.values()))} files on {dialect} "
+              f"in {time.perf_counter() - seed_start:.1f}s")
+
+        results = {}
+        for name in args.endpoints.split(','):
+            requests = list(make_requests(name, users, files_by_user, tokens, args, rng))
+            results[name] = result = run_endpoint(app, requests, args.clients)
+            print(f"{name:<9} {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.2f}ms  "
+                  f"p99={result['p99_ms']:7.2f}ms  statuses={result['statuses']}")
+    finally:
+        if smtp is not None:
+            smtp.stop()
+        if s3_server is not None:
+            s3_server.stop()
+        tmp.cleanup()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'database': dialect,
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
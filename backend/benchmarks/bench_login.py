@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_login.py
+#
+# Measures /api/login throughput with password hashing done in the request thread
+# (--workers 0) and in process pools of several sizes, while a probe client keeps
+# calling the cheap /api/user endpoint to show how much hashing starves it.
+#
+#   cd backend && python -m benchmarks.bench_login --workers 0,1,2,4 --clients 16 --duration 5
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# A file database, so the client threads share it
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_login.db')
+
+for key, value in {
+    'SECRET_KEY': 'bench', 'JWT_SECRET_KEY': 'bench-secret-key-that-is-long-enough',
+    'DATABASE_URL': f"sqlite:///{DB_PATH}",
+    'SMTP_HOST': 'localhost', 'SMTP_USER': 'bench', 'SMTP_PASS': 'bench', 'EMAIL_SENDER': 'bench@localhost',
+    'AWS_ACCESS_KEY': 'bench', 'AWS_SECRET_KEY': 'bench', 'AWS_S3_BUCKET': 'bench',
+    'RATE_LIMIT_ENABLED': 'false',
+}.items():
+    os.environ.setdefault(key, value)
+
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+from app.passwords import create_password_hasher  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+
+
+def percentile(timings, fraction):
+    return timings[max(int(len(timings) * fraction) - 1, 0)] if timings else float('nan')
+
+
+def run(app, token, clients, duration):
+    stop = time.monotonic() + duration
+    codes = {}
+    codes_lock = threading.Lock()
+    probe_timings = []
+
+    def login_client():
+        client = app.test_client()
+        while time.monotonic() < stop:
+            code = client.post('/api/login', json={'identifier': 'bench', 'password': PASSWORD}).status_code
+            with codes_lock:
+                codes[code] = codes.get(code, 0) + 1
+
+    def probe_client():
+        client = app.test_client()
+        headers = {'Authorization': f"Bearer {token}"}
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            client.get('/api/user', headers=headers)
+            probe_timings.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe_client))
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    probe_timings.sort()
+    return {
+        'logins_per_sec': codes.get(200, 0) / elapsed,
+        'shed': codes.get(503, 0),
+        'errors': sum(n for code, n in codes.items() if code not in (200, 503)),
+        'probe_p50_ms': statistics.median(probe_timings) if probe_timings else float('nan'),
+        'probe_p99_ms': percentile(probe_timings, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='0,1,2,4', help='Comma-separated pool sizes; 0 hashes inline.')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent login clients.')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run.')
+    parser.add_argument('--queue-max', type=int, default=0, help='Queue limit; defaults to 4 per worker.')
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@localhost')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        password_hash = user.password_hash
+    token = app.test_client().post(
+        '/api/login', json={'identifier': 'bench', 'password': PASSWORD}
+    ).get_json()['access_token']
+
+    for workers in (int(w) for w in args.workers.split(',')):
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        app.config['PASSWORD_HASH_QUEUE_MAX'] = args.queue_max or 4 * max(workers, 1)
+        hasher = app.extensions['password_hasher'] = create_password_hasher(app)
+        hasher.verify(password_hash, PASSWORD)  # start the pool outside the timed run
+        result = run(app, token, args.clients, args.duration)
+        hasher.shutdown()
+        print(f"workers={workers:<3} logins/s={result['logins_per_sec']:8.1f} shed={result['shed']:<6} "
+              f"errors={result['errors']:<4} /api/user p50={result['probe_p50_ms']:.2f}ms "
+              f"p99={result['probe_p99_ms']:.2f}ms")
+    os.remove(DB_PATH)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# backend/benchmarks/bench_presign.py
+#
+# Compares presigned URL latency when a new S3 client is built per call (the old
+# behaviour) against the cached per-process client. Presigning is local, so no
+# network or real bucket is needed.
+#
+#   cd backend && python -m benchmarks.bench_presign --iterations 500
+import argparse
+import os
+import statistics
+import time
+
+for key, value in {
+    'SECRET_KEY': 'bench', 'JWT_SECRET_KEY': 'bench', 'DATABASE_URL': 'sqlite://',
+    'SMTP_HOST': 'localhost', 'SMTP_USER': 'bench', 'SMTP_PASS': 'bench', 'EMAIL_SENDER': 'bench@localhost',
+    'AWS_ACCESS_KEY': 'bench', 'AWS_SECRET_KEY': 'bench', 'AWS_S3_BUCKET': 'bench',
+}.items():
+    os.environ.setdefault(key, value)
+
+from app import create_app  # noqa: E402
+from app.services import create_s3_client, get_s3_client, get_bucket_name  # noqa: E402
+
+
+def presign(client, s3_key):
+    return client.generate_presigned_url(
+        ClientMethod='get_object',
+        Params={'Bucket': get_bucket_name(), 'Key': s3_key},
+        ExpiresIn=3600
+    )
+
+
+def measure(get_client, iterations):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        presign(get_client(), f"bench/{i}")
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p99_ms': timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        get_s3_client()  # warm the cache so the first call does not skew the results
+        for name, get_client in (('new client per call', create_s3_client), ('cached client', get_s3_client)):
+            result = measure(get_client, args.iterations)
+            print(f"{name:<22} mean={result['mean_ms']:.3f}ms p50={result['p50_ms']:.3f}ms "
+                  f"p99={result['p99_ms']:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
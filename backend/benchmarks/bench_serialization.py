@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_serialization.py
+#
+# Measures the CPU time and response size of one /api/files listing under each JSON
+# provider, with and without ?fields= selection, and for each response encoding the
+# server can produce (brotli only when the brotli package is installed).
+#
+#   cd backend && python -m benchmarks.bench_serialization --files 2000 --shares-per-file 3
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_serialization.db')
+
+for key, value in {
+    'SECRET_KEY': 'bench', 'JWT_SECRET_KEY': 'bench-secret-key-that-is-long-enough',
+    'DATABASE_URL': f"sqlite:///{DB_PATH}",
+    'SMTP_HOST': 'localhost', 'SMTP_USER': 'bench', 'SMTP_PASS': 'bench', 'EMAIL_SENDER': 'bench@localhost',
+    'AWS_ACCESS_KEY': 'bench', 'AWS_SECRET_KEY': 'bench', 'AWS_S3_BUCKET': 'bench',
+    'EMAIL_WORKER_ENABLED': 'false', 'METRICS_ENABLED': 'false',
+}.items():
+    os.environ.setdefault(key, value)
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, File, SharedFile  # noqa: E402
+from app.serialization import OrjsonProvider, StdlibJSONProvider  # noqa: E402
+
+SPARSE_FIELDS = 'id,filename,upload_time,shared_by'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=2000, help='Files owned by and shared with the user.')
+    parser.add_argument('--shares-per-file', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=20)
+    return parser.parse_args()
+
+
+def seed(app, args):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.now(timezone.utc)
+        db.session.execute(db.insert(User), [
+            {'username': f"user{i}", 'email': f"user{i}@bench.local", 'password_hash': '-'}
+            for i in range(args.shares_per_file + 2)
+        ])
+        # User 1 owns half the files, each shared with several users; user 2 shares the rest with user 1
+        db.session.execute(db.insert(File), [
+            {'user_id': 1 if n % 2 else 2, 'filename': f"quarterly-report-{n}.pdf", 's3_key': f"seed/{n}",
+             'size': 1024, 'upload_time': now}
+            for n in range(args.files)
+        ])
+        file_ids = db.session.execute(db.select(File.id, File.user_id)).all()
+        db.session.execute(db.insert(SharedFile), [
+            {'file_id': file_id, 'shared_with_user_id': recipient, 'share_timestamp': now}
+            for file_id, owner in file_ids
+            for recipient in ([3 + r for r in range(args.shares_per_file - 1)] + [2] if owner == 1 else [1])
+        ])
+        db.session.commit()
+        return create_access_token(identity='1')
+
+
+def measure(app, headers, path, iterations):
+    client = app.test_client()
+    client.get(path, headers=headers)
+    cpu = []
+    for _ in range(iterations):
+        start = time.process_time()
+        response = client.get(path, headers=headers)
+        cpu.append(time.process_time() - start)
+    cpu.sort()
+    return cpu[len(cpu) // 2] * 1000, len(response.data), response.headers.get('Content-Encoding', 'identity')
+
+
+def main():
+    args = parse_args()
+    app = create_app()
+    token = seed(app, args)
+    encodings = ['identity', 'gzip'] + (['br'] if importlib.util.find_spec('brotli') else [])
+    providers = {'stdlib': StdlibJSONProvider(app), 'orjson': OrjsonProvider(app)}
+
+    print(f"GET /api/files with {args.files} files, median of {args.iterations} requests")
+    print(f"{'provider':<8} {'fields':<7} {'encoding':<9} {'cpu ms':>8} {'bytes':>10}")
+    baseline = None
+    for provider_name, provider in providers.items():
+        app.json = provider
+        for fields in ('all', 'sparse'):
+            path = '/api/files' if fields == 'all' else f"/api/files?fields={SPARSE_FIELDS}"
+            for encoding in encodings:
+                headers = {'Authorization': f"Bearer {token}", 'Accept-Encoding': encoding}
+                cpu_ms, size, served = measure(app, headers, path, args.iterations)
+                if baseline is None:
+                    baseline = cpu_ms, size
+                print(f"{provider_name:<8} {fields:<7} {served:<9} {cpu_ms:8.2f} {size:10d}  "
+                      f"({cpu_ms / baseline[0] * 100:5.1f}% cpu, {size / baseline[1] * 100:5.1f}% bytes)")
+    os.remove(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_transfer.py
+#
+# Measures server-side upload throughput through upload_file_to_s3 for a range of
+# file sizes and transfer settings. Runs against any S3-compatible endpoint
+# (MinIO, moto_server); without --endpoint-url it starts an in-process moto server.
+#
+#   cd backend && python -m benchmarks.bench_transfer --sizes 10MB,100MB,1GB --concurrency 4,8
+import argparse
+import io
+import json
+import os
+import time
+
+for key, value in {
+    'SECRET_KEY': 'bench', 'JWT_SECRET_KEY': 'bench', 'DATABASE_URL': 'sqlite://',
+    'SMTP_HOST': 'localhost', 'SMTP_USER': 'bench', 'SMTP_PASS': 'bench', 'EMAIL_SENDER': 'bench@localhost',
+    'AWS_ACCESS_KEY': 'bench', 'AWS_SECRET_KEY': 'bench', 'AWS_S3_BUCKET': 'bench', 'AWS_REGION': 'us-east-1',
+}.items():
+    os.environ.setdefault(key, value)
+
+from app import create_app  # noqa: E402
+from app.services import get_s3_client, upload_file_to_s3  # noqa: E402
+
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+class GeneratedFile(io.RawIOBase):
+    # A read-only stream of `size` bytes that never holds more than one read in memory
+    def __init__(self, size):
+        self.remaining = size
+        self._block = os.urandom(1024 * 1024)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.remaining)
+        view = memoryview(buffer)
+        written = 0
+        while written < n:
+            chunk = min(n - written, len(self._block))
+            view[written:written + chunk] = self._block[:chunk]
+            written += chunk
+        self.remaining -= n
+        return n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--endpoint-url')
+    parser.add_argument('--sizes', default='10MB,100MB,1GB,5GB')
+    parser.add_argument('--part-sizes', default='16MB')
+    parser.add_argument('--concurrency', default='1,4,8')
+    parser.add_argument('--max-memory', default='256MB')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if not endpoint_url:
+        from moto.server import ThreadedMotoServer
+        server = ThreadedMotoServer(port=0)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f"http://{host}:{port}"
+
+    app = create_app()
+    app.config['AWS_S3_ENDPOINT_URL'] = endpoint_url
+    app.config['S3_TRANSFER_MAX_MEMORY'] = parse_size(args.max_memory)
+    results = []
+    try:
+        with app.app_context():
+            client = get_s3_client()
+            try:
+                client.create_bucket(Bucket=app.config['AWS_S3_BUCKET'])
+            except client.exceptions.BucketAlreadyOwnedByYou:
+                pass
+
+            for size in map(parse_size, args.sizes.split(',')):
+                for part_size in map(parse_size, args.part_sizes.split(',')):
+                    for concurrency in map(int, args.concurrency.split(',')):
+                        app.config['MULTIPART_PART_SIZE'] = part_size
+                        app.config['S3_TRANSFER_MAX_CONCURRENCY'] = concurrency
+                        key = f"bench/{size}-{part_size}-{concurrency}"
+                        start = time.perf_counter()
+                        upload_file_to_s3(io.BufferedReader(GeneratedFile(size)), key)
+                        elapsed = time.perf_counter() - start
+                        client.delete_object(Bucket=app.config['AWS_S3_BUCKET'], Key=key)
+                        result = {
+                            'size': size, 'part_size': part_size, 'concurrency': concurrency,
+                            'seconds': elapsed, 'mb_per_s': size / UNITS['MB'] / elapsed
+                        }
+                        results.append(result)
+                        print(f"size={size / UNITS['MB']:.0f}MB part={part_size / UNITS['MB']:.0f}MB "
+                              f"concurrency={concurrency} {elapsed:.2f}s {result['mb_per_s']:.1f}MB/s")
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
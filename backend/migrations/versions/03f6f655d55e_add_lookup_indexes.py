@@ -0,0 +1,35 @@
+"""add indexes for hot lookup paths and unique shares
+
+Revision ID: 03f6f655d55e
+Revises: 39a258c1b4d6
+Create Date: 2026-10-18 09:31:17.870245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '03f6f655d55e'
+down_revision = '39a258c1b4d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicate shares left by the old read-then-insert path before enforcing uniqueness
+    op.execute(
+        'DELETE FROM sharedfile WHERE id NOT IN '
+        '(SELECT MIN(id) FROM sharedfile GROUP BY file_id, shared_with_user_id)'
+    )
+    op.create_index('uq_sharedfile_file_id_shared_with_user_id', 'sharedfile', ['file_id', 'shared_with_user_id'], unique=True)
+    op.create_index('ix_sharedfile_shared_with_user_id_share_timestamp', 'sharedfile', ['shared_with_user_id', 'share_timestamp', 'id'], unique=False)
+    op.create_index('ix_file_user_id_upload_time', 'file', ['user_id', 'upload_time', 'id'], unique=False)
+    op.create_index(op.f('ix_email_verification_expires_at'), 'email_verification', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_email_verification_expires_at'), table_name='email_verification')
+    op.drop_index('ix_file_user_id_upload_time', table_name='file')
+    op.drop_index('ix_sharedfile_shared_with_user_id_share_timestamp', table_name='sharedfile')
+    op.drop_index('uq_sharedfile_file_id_shared_with_user_id', table_name='sharedfile')
@@ -0,0 +1,44 @@
+"""add content-addressed blobs
+
+Revision ID: 102712a0cb8c
+Revises: 03f6f655d55e
+Create Date: 2026-10-18 10:02:55.319480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '102712a0cb8c'
+down_revision = '03f6f655d55e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blob',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('s3_key', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.alter_column('size', existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=True)
+        batch_op.create_index(batch_op.f('ix_file_blob_id'), ['blob_id'], unique=False)
+        batch_op.create_foreign_key('fk_file_blob_id_blob', 'blob', ['blob_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_file_blob_id_blob', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_file_blob_id'))
+        batch_op.alter_column('size', existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=True)
+        batch_op.drop_column('blob_id')
+
+    op.drop_table('blob')
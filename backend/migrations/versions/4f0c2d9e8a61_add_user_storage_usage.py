@@ -0,0 +1,34 @@
+"""add per-user storage usage and quota
+
+Revision ID: 4f0c2d9e8a61
+Revises: 75438f22bb0f
+Create Date: 2026-10-18 17:41:26.803511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f0c2d9e8a61'
+down_revision = '75438f22bb0f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('storage_used', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('storage_quota', sa.BigInteger(), nullable=True))
+
+    # Start from the sizes already recorded; `flask reconcile-usage --repair-sizes` fixes older rows
+    op.execute(
+        'UPDATE "user" SET storage_used = '
+        '(SELECT COALESCE(SUM(file.size), 0) FROM file WHERE file.user_id = "user".id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('storage_quota')
+        batch_op.drop_column('storage_used')
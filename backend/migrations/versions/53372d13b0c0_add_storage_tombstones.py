@@ -0,0 +1,38 @@
+"""add storage tombstones for garbage collection
+
+Revision ID: 53372d13b0c0
+Revises: 7a16a5cb31f3
+Create Date: 2026-10-18 11:18:36.731902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '53372d13b0c0'
+down_revision = '7a16a5cb31f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('storage_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('s3_key', sa.String(length=255), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_storage_tombstone_next_attempt_at'), 'storage_tombstone', ['next_attempt_at'], unique=False)
+    op.create_index(op.f('ix_file_s3_key'), 'file', ['s3_key'], unique=False)
+    op.create_index(op.f('ix_blob_s3_key'), 'blob', ['s3_key'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_blob_s3_key'), table_name='blob')
+    op.drop_index(op.f('ix_file_s3_key'), table_name='file')
+    op.drop_index(op.f('ix_storage_tombstone_next_attempt_at'), table_name='storage_tombstone')
+    op.drop_table('storage_tombstone')
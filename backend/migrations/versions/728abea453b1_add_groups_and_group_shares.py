@@ -0,0 +1,73 @@
+"""add groups and group shares
+
+Revision ID: 728abea453b1
+Revises: 9c4e1b7d2f30
+Create Date: 2026-10-18 17:48:58.845707
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '728abea453b1'
+down_revision = '9c4e1b7d2f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_group',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('user_group', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_group_owner_id'), ['owner_id'], unique=False)
+
+    op.create_table('group_membership',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('added_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['user_group.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('group_membership', schema=None) as batch_op:
+        batch_op.create_index('ix_group_membership_user_id_group_id', ['user_id', 'group_id'], unique=False)
+        batch_op.create_index('uq_group_membership_group_id_user_id', ['group_id', 'user_id'], unique=True)
+
+    op.create_table('group_share',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('access_level', sa.String(length=20), nullable=True),
+    sa.Column('share_timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['file_id'], ['file.id'], ),
+    sa.ForeignKeyConstraint(['group_id'], ['user_group.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('group_share', schema=None) as batch_op:
+        batch_op.create_index('ix_group_share_group_id_share_timestamp', ['group_id', 'share_timestamp', 'id'], unique=False)
+        batch_op.create_index('uq_group_share_file_id_group_id', ['file_id', 'group_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('group_share', schema=None) as batch_op:
+        batch_op.drop_index('uq_group_share_file_id_group_id')
+        batch_op.drop_index('ix_group_share_group_id_share_timestamp')
+
+    op.drop_table('group_share')
+    with op.batch_alter_table('group_membership', schema=None) as batch_op:
+        batch_op.drop_index('uq_group_membership_group_id_user_id')
+        batch_op.drop_index('ix_group_membership_user_id_group_id')
+
+    op.drop_table('group_membership')
+    with op.batch_alter_table('user_group', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_group_owner_id'))
+
+    op.drop_table('user_group')
@@ -0,0 +1,26 @@
+"""add per-user files version for listing etags
+
+Revision ID: 75438f22bb0f
+Revises: 53372d13b0c0
+Create Date: 2026-10-18 11:52:09.417388
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '75438f22bb0f'
+down_revision = '53372d13b0c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('files_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('files_version')
@@ -0,0 +1,39 @@
+"""add resumable upload sessions
+
+Revision ID: 7a16a5cb31f3
+Revises: 102712a0cb8c
+Create Date: 2026-10-18 10:40:12.004519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a16a5cb31f3'
+down_revision = '102712a0cb8c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('s3_key', sa.String(length=255), nullable=False),
+    sa.Column('upload_id', sa.String(length=1024), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('part_size', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('s3_key')
+    )
+    op.create_index(op.f('ix_upload_session_user_id'), 'upload_session', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_upload_session_user_id'), table_name='upload_session')
+    op.drop_table('upload_session')
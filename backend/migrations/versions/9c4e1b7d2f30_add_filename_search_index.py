@@ -0,0 +1,30 @@
+"""add trigram index for filename search
+
+Revision ID: 9c4e1b7d2f30
+Revises: 4f0c2d9e8a61
+Create Date: 2026-10-18 19:02:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1b7d2f30'
+down_revision = '4f0c2d9e8a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only PostgreSQL gets an index; SQLite searches each user's files through the user_id indexes
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_file_filename_trgm ON file USING gin (filename gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_file_filename_trgm')
@@ -0,0 +1,24 @@
+"""add storage tombstone key index
+
+Revision ID: b5e83d0f4c17
+Revises: 728abea453b1
+Create Date: 2026-10-18 18:20:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e83d0f4c17'
+down_revision = '728abea453b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_storage_tombstone_s3_key'), 'storage_tombstone', ['s3_key'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_storage_tombstone_s3_key'), table_name='storage_tombstone')
@@ -0,0 +1,39 @@
+"""add outbound email status token
+
+Revision ID: e1a9c64b2d58
+Revises: b5e83d0f4c17
+Create Date: 2026-10-18 18:34:12.918230
+
+"""
+import secrets
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a9c64b2d58'
+down_revision = 'b5e83d0f4c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbound_email', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_token', sa.String(length=43), nullable=True))
+
+    outbound_email = sa.table('outbound_email', sa.column('id', sa.Integer), sa.column('status_token', sa.String))
+    connection = op.get_bind()
+    for email_id in connection.execute(sa.select(outbound_email.c.id)).scalars().all():
+        connection.execute(outbound_email.update().where(outbound_email.c.id == email_id).values(
+            status_token=secrets.token_urlsafe(32)
+        ))
+
+    with op.batch_alter_table('outbound_email', schema=None) as batch_op:
+        batch_op.alter_column('status_token', existing_type=sa.String(length=43), nullable=False)
+        batch_op.create_unique_constraint(batch_op.f('uq_outbound_email_status_token'), ['status_token'])
+
+
+def downgrade():
+    with op.batch_alter_table('outbound_email', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('uq_outbound_email_status_token'), type_='unique')
+        batch_op.drop_column('status_token')
@@ -0,0 +1,82 @@
+# backend/tests/conftest.py
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+TEST_DIR = tempfile.mkdtemp(prefix='file-sharing-tests-')
+
+# Config reads the environment at import time, so this runs before the app is imported
+for key, value in {
+    'SECRET_KEY': 'test', 'JWT_SECRET_KEY': 'test-secret-key-that-is-long-enough',
+    'DATABASE_URL': f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}",
+    'SMTP_HOST': 'localhost', 'SMTP_USER': 'test', 'SMTP_PASS': 'test', 'EMAIL_SENDER': 'test@localhost',
+    'STORAGE_BACKEND': 'local', 'LOCAL_STORAGE_PATH': os.path.join(TEST_DIR, 'storage'),
+    'PASSWORD_HASH_WORKERS': '0', 'EMAIL_WORKER_ENABLED': 'false', 'GC_WORKER_ENABLED': 'false',
+    'VERIFICATION_SWEEP_ENABLED': 'false', 'RATE_LIMIT_ENABLED': 'false', 'METRICS_ENABLED': 'false',
+}.items():
+    os.environ[key] = value
+
+import pytest  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, File, SharedFile  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(user_id):
+    return {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+def seed(users, files_per_user, shares_per_file):
+    # Each user owns files_per_user files, each shared with the next shares_per_file users
+    now = datetime.now(timezone.utc)
+    db.session.execute(db.insert(User), [
+        {'username': f"user{i}", 'email': f"user{i}@test.local", 'password_hash': '-'}
+        for i in range(users)
+    ])
+    user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+    db.session.execute(db.insert(File), [
+        {'user_id': user_id, 'filename': f"report-{user_id}-{n}.pdf", 's3_key': f"seed/{user_id}/{n}",
+         'size': 1024, 'upload_time': now - timedelta(minutes=n)}
+        for user_id in user_ids
+        for n in range(files_per_user)
+    ])
+    files = db.session.execute(db.select(File.id, File.user_id)).all()
+    db.session.execute(db.insert(SharedFile), [
+        {'file_id': file_id, 'shared_with_user_id': user_ids[(user_ids.index(owner) + r) % len(user_ids)],
+         'share_timestamp': now}
+        for file_id, owner in files
+        for r in range(1, shares_per_file + 1)
+    ])
+    db.session.commit()
+    return user_ids
+
+
+@pytest.fixture
+def statements(app):
+    # Every SQL statement sent to the primary engine while the fixture is active, with the
+    # first parameter set of an executemany
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield captured
+    event.remove(db.engine, 'before_cursor_execute', record)
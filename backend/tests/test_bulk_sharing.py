@@ -0,0 +1,75 @@
+# backend/tests/test_bulk_sharing.py
+import pytest
+from app.models import File, SharedFile
+from conftest import auth_headers, seed
+
+
+@pytest.fixture
+def user_ids(app):
+    return seed(users=3, files_per_user=2, shares_per_file=1)
+
+
+@pytest.mark.parametrize('file_ids', [[], ['1'], [True], [1.0], [[1]], [{'id': 1}], None])
+def test_share_bulk_rejects_invalid_file_ids(client, user_ids, file_ids):
+    response = client.post('/api/share/bulk', headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'recipient_emails': ['user2@test.local']
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('recipient_emails', [[], [1], [['user2@test.local']], 'user2@test.local'])
+def test_share_bulk_rejects_invalid_emails(client, user_ids, recipient_emails):
+    file_id = File.query.filter_by(user_id=user_ids[0]).first().id
+    response = client.post('/api/share/bulk', headers=auth_headers(user_ids[0]), json={
+        'file_ids': [file_id], 'recipient_emails': recipient_emails
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('file_ids, user_ids_', [
+    ([True], [2]), (['1'], [2]), ([1], [False]), ([1], ['2']), ([1], [[2]]), ([1], []),
+])
+def test_unshare_bulk_rejects_invalid_ids(client, user_ids, file_ids, user_ids_):
+    response = client.post('/api/unshare/bulk', headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'user_ids': user_ids_
+    })
+    assert response.status_code == 400
+
+
+def test_share_and_unshare_bulk(client, user_ids):
+    owner, _, recipient = user_ids
+    file_ids = [f.id for f in File.query.filter_by(user_id=owner)]
+    response = client.post('/api/share/bulk', headers=auth_headers(owner), json={
+        'file_ids': file_ids, 'recipient_emails': ['user2@test.local']
+    })
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['results']] == ['shared', 'shared']
+
+    response = client.post('/api/unshare/bulk', headers=auth_headers(owner), json={
+        'file_ids': file_ids, 'user_ids': [recipient]
+    })
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['results']] == ['removed', 'removed']
+    assert SharedFile.query.filter(
+        SharedFile.file_id.in_(file_ids), SharedFile.shared_with_user_id == recipient
+    ).count() == 0
+
+
+@pytest.mark.parametrize('access_level', [{}, ['read'], 1, 'admin', None])
+def test_share_bulk_rejects_unknown_access_level(client, user_ids, access_level):
+    file_id = File.query.filter_by(user_id=user_ids[0]).first().id
+    response = client.post('/api/share/bulk', headers=auth_headers(user_ids[0]), json={
+        'file_ids': [file_id], 'recipient_emails': ['user2@test.local'], 'access_level': access_level
+    })
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'access_level must be one of: read, write'
+
+
+def test_share_bulk_with_write_access(client, user_ids):
+    file_id = File.query.filter_by(user_id=user_ids[0]).first().id
+    response = client.post('/api/share/bulk', headers=auth_headers(user_ids[0]), json={
+        'file_ids': [file_id], 'recipient_emails': ['user2@test.local'], 'access_level': 'write'
+    })
+    assert response.status_code == 200
+    share = SharedFile.query.filter_by(file_id=file_id, shared_with_user_id=user_ids[2]).one()
+    assert share.access_level == 'write'
@@ -0,0 +1,75 @@
+# backend/tests/test_downloads.py
+import io
+import time
+import pytest
+from app.archive import stream_zip
+from app.models import File
+from conftest import auth_headers, seed
+
+
+@pytest.fixture
+def user_ids(app):
+    return seed(users=2, files_per_user=2, shares_per_file=1)
+
+
+def test_zip_rejects_non_boolean_prefetch(client, user_ids):
+    file_ids = [f.id for f in File.query.filter_by(user_id=user_ids[0])]
+    for prefetch in ('false', 0, 1, None, [True]):
+        response = client.post('/api/download/zip', headers=auth_headers(user_ids[0]), json={
+            'file_ids': file_ids, 'prefetch': prefetch
+        })
+        assert response.status_code == 400, prefetch
+        assert response.get_json()['msg'] == 'prefetch must be true or false'
+
+
+@pytest.mark.parametrize('file_ids', [[], ['1'], [1.5], [True], [1, None], [[1]], {'1': 1}, '1'])
+def test_batch_rejects_ids_that_are_not_integers(client, user_ids, file_ids):
+    response = client.post('/api/download/batch', headers=auth_headers(user_ids[0]), json={'file_ids': file_ids})
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'file_ids must be a non-empty list of file ids'
+
+
+def test_batch_returns_accessible_files(client, user_ids):
+    owned, shared = (File.query.filter_by(user_id=user_id).first().id for user_id in user_ids)
+    response = client.post('/api/download/batch', headers=auth_headers(user_ids[0]), json={
+        'file_ids': [owned, shared, 999999]
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [d['id'] for d in data['downloads']] == [owned, shared]
+    assert data['unavailable'] == [999999]
+
+
+@pytest.mark.parametrize('archive_name', [5, ['a.zip'], {'name': 'a.zip'}, True])
+def test_zip_rejects_non_string_archive_name(client, user_ids, archive_name):
+    file_ids = [f.id for f in File.query.filter_by(user_id=user_ids[0])]
+    response = client.post('/api/download/zip', headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'archive_name': archive_name
+    })
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'archive_name must be a string'
+
+
+class TrackingStorage:
+    def __init__(self):
+        self.streams = []
+
+    def open(self, key):
+        if self.streams:
+            # Later objects are slow to open, so the prefetch is still running when abandoned
+            time.sleep(0.2)
+        stream = io.BytesIO(key.encode() * 1000)
+        self.streams.append(stream)
+        return stream
+
+
+def test_abandoned_zip_closes_prefetched_stream(app):
+    storage = TrackingStorage()
+    files = [(n, f"file{n}.txt", f"key{n}", None, None) for n in range(3)]
+    body = stream_zip(storage, files, 16, prefetch=True)
+    next(body)
+    # The client goes away while the second object is being prefetched
+    body.close()
+    time.sleep(0.5)
+    assert len(storage.streams) == 2
+    assert all(stream.closed for stream in storage.streams)
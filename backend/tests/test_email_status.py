@@ -0,0 +1,24 @@
+# backend/tests/test_email_status.py
+from app.models import OutboundEmail
+
+
+def register(client, email='dana@test.local'):
+    response = client.post('/api/register-initiate', json={
+        'username': 'dana', 'email': email, 'password': 'correct horse'
+    })
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_status_is_served_by_the_returned_token(client):
+    email_id = register(client)['email_id']
+    assert len(email_id) >= 40
+    response = client.get(f"/api/emails/{email_id}/status")
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'pending', 'attempts': 0}
+
+
+def test_status_is_not_served_by_row_id(client):
+    register(client)
+    email = OutboundEmail.query.one()
+    assert client.get(f"/api/emails/{email.id}/status").status_code == 404
@@ -0,0 +1,39 @@
+# backend/tests/test_etags.py
+import pytest
+from conftest import auth_headers, seed
+
+
+@pytest.fixture
+def user_ids(app):
+    # Enough files that the listing is above COMPRESS_MIN_SIZE and gets gzip-encoded
+    return seed(users=3, files_per_user=50, shares_per_file=2)
+
+
+@pytest.mark.parametrize('path', ['/api/files', '/api/files/owned', '/api/files/shared'])
+def test_conditional_get_keeps_the_same_validator(client, user_ids, path):
+    headers = {**auth_headers(user_ids[0]), 'Accept-Encoding': 'gzip'}
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    for _ in range(3):
+        response = client.get(path, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+    # The identity representation has the same validator
+    response = client.get(path, headers=auth_headers(user_ids[0]))
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['ETag'] == etag
+
+
+def test_changed_listing_gets_a_new_validator(client, user_ids):
+    headers = {**auth_headers(user_ids[0]), 'Accept-Encoding': 'gzip'}
+    etag = client.get('/api/files', headers=headers).headers['ETag']
+    file_id = client.get('/api/files', headers=auth_headers(user_ids[0])).get_json()['owned_files'][0]['id']
+    assert client.delete(f"/api/files/{file_id}", headers=headers).status_code == 200
+    response = client.get('/api/files', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,121 @@
+# backend/tests/test_garbage.py
+import io
+import os
+import pytest
+from app import db, routes
+from app.garbage import collect_garbage
+from app.models import User, File, StorageTombstone
+from app.storage import get_storage
+from conftest import auth_headers
+
+CONTENT = b'quarterly numbers'
+
+
+@pytest.fixture
+def user_id(app):
+    app.config['GC_GRACE_PERIOD'] = 0
+    user = User(username='alice', email='alice@test.local', password_hash='-')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def upload(client, user_id):
+    response = client.post('/api/upload', headers=auth_headers(user_id), data={
+        'file': (io.BytesIO(CONTENT), 'report.txt')
+    })
+    assert response.status_code == 201
+    return db.session.get(File, response.get_json()['file_id'])
+
+
+def stored(key):
+    return os.path.exists(get_storage().path(key))
+
+
+def test_deleted_blob_is_collected(client, user_id):
+    file_obj = upload(client, user_id)
+    assert client.delete(f"/api/files/{file_obj.id}", headers=auth_headers(user_id)).status_code == 200
+    assert collect_garbage() == {'reclaimed': 1, 'skipped': 0, 'failed': 0}
+    assert not stored(file_obj.s3_key)
+
+
+def test_upload_withdraws_pending_tombstone(client, user_id):
+    key = upload(client, user_id).s3_key
+    client.delete('/api/files', headers=auth_headers(user_id), json={
+        'file_ids': [f.id for f in File.query.all()]
+    })
+    assert StorageTombstone.query.filter_by(s3_key=key).count() == 1
+
+    # The same content is uploaded again before the collector gets to the old object
+    upload(client, user_id)
+    assert StorageTombstone.query.filter_by(s3_key=key).count() == 0
+    assert collect_garbage() == {'reclaimed': 0, 'skipped': 0, 'failed': 0}
+    assert stored(key)
+
+
+def test_upload_after_collection_stores_object_again(client, user_id):
+    file_obj = upload(client, user_id)
+    client.delete(f"/api/files/{file_obj.id}", headers=auth_headers(user_id))
+    collect_garbage()
+    assert not stored(file_obj.s3_key)
+    assert upload(client, user_id).s3_key == file_obj.s3_key
+    assert stored(file_obj.s3_key)
+
+
+def test_failed_deletes_are_retried(app, client, user_id, monkeypatch):
+    file_obj = upload(client, user_id)
+    client.delete(f"/api/files/{file_obj.id}", headers=auth_headers(user_id))
+    monkeypatch.setattr(get_storage(), 'delete_many', lambda keys: {key: 'unavailable' for key in keys})
+    assert collect_garbage(max_batches=1) == {'reclaimed': 0, 'skipped': 0, 'failed': 1}
+    tombstone = StorageTombstone.query.one()
+    assert (tombstone.s3_key, tombstone.attempts, tombstone.last_error) == (file_obj.s3_key, 1, 'unavailable')
+    assert stored(file_obj.s3_key)
+
+
+@pytest.mark.parametrize('file_ids', [[True], [[1]], ['1'], [1.0], []])
+def test_bulk_delete_rejects_ids_that_are_not_integers(client, user_id, file_ids):
+    file_obj = upload(client, user_id)
+    response = client.delete('/api/files', headers=auth_headers(user_id), json={'file_ids': file_ids})
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'file_ids must be a non-empty list of file ids'
+    assert db.session.get(File, file_obj.id) is not None
+
+
+def test_upload_holds_no_database_lock_while_storing(client, user_id, monkeypatch):
+    storage = get_storage()
+    save = storage.save
+
+    def save_while_writing(file_obj, key):
+        # Another writer gets through while the object is being stored
+        with db.engine.connect() as connection:
+            connection.execute(db.update(User).where(User.id == user_id).values(files_version=User.files_version + 1))
+            connection.commit()
+        save(file_obj, key)
+
+    monkeypatch.setattr(storage, 'save', save_while_writing)
+    upload(client, user_id)
+
+
+def test_upload_over_quota_after_storing_discards_object(client, user_id, monkeypatch):
+    monkeypatch.setattr('app.routes.charge_storage', lambda user_id, size: False)
+    response = client.post('/api/upload', headers=auth_headers(user_id), data={
+        'file': (io.BytesIO(CONTENT), 'report.txt')
+    })
+    assert response.status_code == 413
+    tombstone = StorageTombstone.query.one()
+    assert File.query.count() == 0
+    assert collect_garbage() == {'reclaimed': 1, 'skipped': 0, 'failed': 0}
+    assert not stored(tombstone.s3_key)
+
+
+def test_upload_restores_object_deleted_by_collector_before_commit(client, user_id, monkeypatch):
+    acquire_blob = routes.acquire_blob
+
+    def acquire_after_collector(sha256, size):
+        # A collector pass that claimed an older tombstone deletes the object just written
+        get_storage().delete_many([f"blobs/{sha256}"])
+        return acquire_blob(sha256, size)
+
+    monkeypatch.setattr(routes, 'acquire_blob', acquire_after_collector)
+    key = upload(client, user_id).s3_key
+    assert stored(key)
@@ -0,0 +1,70 @@
+# backend/tests/test_groups.py
+import pytest
+from app.models import File, GroupShare
+from conftest import auth_headers, seed
+
+
+@pytest.fixture
+def user_ids(app):
+    return seed(users=3, files_per_user=2, shares_per_file=1)
+
+
+@pytest.fixture
+def group_id(client, user_ids):
+    response = client.post('/api/groups', headers=auth_headers(user_ids[0]), json={
+        'name': 'team', 'member_emails': ['user1@test.local']
+    })
+    assert response.status_code == 201
+    return response.get_json()['group_id']
+
+
+@pytest.mark.parametrize('path', ['/api/share/group', '/api/unshare/group'])
+@pytest.mark.parametrize('bad_group_id', [True, '1', 'abc', [1], {}, None, 1.0])
+def test_group_share_rejects_invalid_group_id(client, user_ids, group_id, path, bad_group_id):
+    file_ids = [f.id for f in File.query.filter_by(user_id=user_ids[0])]
+    response = client.post(path, headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'group_id': bad_group_id
+    })
+    assert response.status_code == 400
+    assert GroupShare.query.count() == 0
+
+
+def test_share_with_group(client, user_ids, group_id):
+    file_ids = [f.id for f in File.query.filter_by(user_id=user_ids[0])]
+    response = client.post('/api/share/group', headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'group_id': group_id
+    })
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['results']] == ['shared', 'shared']
+
+
+@pytest.mark.parametrize('body', [
+    {'name': 5}, {'name': ['team']}, {'name': '   '}, {'name': 'team', 'member_emails': [[1]]},
+    {'name': 'team', 'member_emails': [1]}, {'name': 'team', 'member_emails': 'user1@test.local'},
+])
+def test_create_group_rejects_invalid_input(client, user_ids, body):
+    response = client.post('/api/groups', headers=auth_headers(user_ids[0]), json=body)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [{}, {'email': ['user2@test.local']}, {'email': 2}, {'email': {}}])
+def test_add_member_rejects_invalid_email(client, user_ids, group_id, body):
+    response = client.post(f"/api/groups/{group_id}/members", headers=auth_headers(user_ids[0]), json=body)
+    assert response.status_code == 400
+
+
+def test_add_member(client, user_ids, group_id):
+    response = client.post(f"/api/groups/{group_id}/members", headers=auth_headers(user_ids[0]), json={
+        'email': 'user2@test.local'
+    })
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize('access_level', [{}, 'owner', 2])
+def test_share_with_group_rejects_unknown_access_level(client, user_ids, group_id, access_level):
+    file_ids = [f.id for f in File.query.filter_by(user_id=user_ids[0])]
+    response = client.post('/api/share/group', headers=auth_headers(user_ids[0]), json={
+        'file_ids': file_ids, 'group_id': group_id, 'access_level': access_level
+    })
+    assert response.status_code == 400
+    assert GroupShare.query.count() == 0
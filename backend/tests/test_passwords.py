@@ -0,0 +1,50 @@
+# backend/tests/test_passwords.py
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from werkzeug.security import check_password_hash
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+METHOD = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(METHOD, workers=1, queue_max=2, timeout=30)
+    yield hasher
+    hasher.shutdown()
+
+
+def kill_workers(hasher):
+    for process in list(hasher._pool._processes.values()):
+        process.kill()
+        process.join()
+
+
+def test_hash_runs_in_pool(hasher):
+    assert check_password_hash(hasher.hash('secret'), 'secret')
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+
+def test_broken_pool_is_replaced(hasher):
+    hasher.hash('secret')
+    broken = hasher._pool
+    kill_workers(hasher)
+    assert check_password_hash(hasher.hash('secret'), 'secret')
+    assert hasher._pool is not broken
+    # Every slot was handed back
+    assert all(hasher._slots.acquire(blocking=False) for _ in range(2))
+
+
+class BrokenPool:
+    def submit(self, fn, *args):
+        raise BrokenProcessPool()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_pool_broken_twice_reports_busy(hasher, monkeypatch):
+    monkeypatch.setattr(hasher, '_get_pool', BrokenPool)
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret')
+    assert all(hasher._slots.acquire(blocking=False) for _ in range(2))
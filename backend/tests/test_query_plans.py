@@ -0,0 +1,124 @@
+# backend/tests/test_query_plans.py
+#
+# Runs EXPLAIN QUERY PLAN on the statements each route sends to a populated SQLite
+# database and checks they are answered through the lookup indexes, never by scanning
+# a whole table.
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from app import db
+from app.garbage import collect_garbage
+from app.models import EmailVerification, File, StorageTombstone
+from app.verification import sweep_expired_verifications
+from conftest import auth_headers, seed
+
+TABLES = ('user', 'file', 'sharedfile', 'email_verification', 'storage_tombstone', 'blob')
+
+
+def query_plans(statements):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        plans = []
+        for statement, parameters in statements:
+            if statement.lstrip().split(None, 1)[0].upper() not in ('SELECT', 'UPDATE', 'DELETE'):
+                continue
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append((statement, [row[3] for row in cursor.fetchall()]))
+        return plans
+    finally:
+        connection.close()
+
+
+def assert_no_table_scans(plans):
+    for statement, plan in plans:
+        for step in plan:
+            match = re.match(r'SCAN (\w+)$', step)
+            assert not (match and match.group(1) in TABLES), f"{step} in plan for {statement}"
+
+
+def assert_uses_index(plans, index):
+    assert any(index in step for _, plan in plans for step in plan), \
+        f"{index} not used by any of:\n" + '\n'.join(statement for statement, _ in plans)
+
+
+@pytest.fixture
+def user_ids(app):
+    return seed(users=20, files_per_user=50, shares_per_file=3)
+
+
+def test_files_listing_uses_owner_and_recipient_indexes(client, user_ids, statements):
+    response = client.get('/api/files', headers=auth_headers(user_ids[0]))
+    assert response.status_code == 200
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert_uses_index(plans, 'ix_file_user_id_upload_time')
+    assert_uses_index(plans, 'ix_sharedfile_shared_with_user_id_share_timestamp')
+
+
+def test_owned_listing_uses_owner_index(client, user_ids, statements):
+    headers = auth_headers(user_ids[0])
+    first = client.get('/api/files/owned?limit=10', headers=headers).get_json()
+    response = client.get(f"/api/files/owned?limit=10&cursor={first['next_cursor']}", headers=headers)
+    assert response.status_code == 200
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert_uses_index(plans, 'ix_file_user_id_upload_time')
+
+
+def test_shared_listing_uses_recipient_index(client, user_ids, statements):
+    response = client.get('/api/files/shared?limit=10', headers=auth_headers(user_ids[0]))
+    assert response.status_code == 200
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert_uses_index(plans, 'ix_sharedfile_shared_with_user_id_share_timestamp')
+
+
+def test_share_checks_recipient_through_unique_indexes(client, user_ids, statements):
+    file_id = File.query.filter_by(user_id=user_ids[0]).first().id
+    response = client.post('/api/share', headers=auth_headers(user_ids[0]), json={
+        'file_id': file_id, 'recipient_email': 'user10@test.local'
+    })
+    assert response.status_code == 200
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert any(statement.startswith('INSERT') and 'ON CONFLICT (file_id, shared_with_user_id)' in statement
+               for statement, _ in statements)
+
+
+def test_download_checks_access_through_share_index(client, user_ids, statements):
+    # user 1's files are shared with users 2-4; user 2 downloads one of them
+    file_id = File.query.filter_by(user_id=user_ids[0]).first().id
+    response = client.get(f"/api/download/{file_id}", headers=auth_headers(user_ids[1]))
+    assert response.status_code == 200
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert_uses_index(plans, 'uq_sharedfile_file_id_shared_with_user_id')
+
+
+def test_verification_sweep_uses_expiry_index(app, statements):
+    now = datetime.now(timezone.utc)
+    db.session.add_all(
+        EmailVerification(username=f"pending{i}", email=f"pending{i}@test.local", password_hash='-',
+                          code='123456', expires_at=now + timedelta(minutes=i - 100, seconds=30))
+        for i in range(500)
+    )
+    db.session.commit()
+    statements.clear()
+    assert sweep_expired_verifications()['swept'] == 100
+    plans = query_plans(statements)
+    assert_no_table_scans(plans)
+    assert_uses_index(plans, 'ix_email_verification_expires_at')
+
+
+def test_garbage_collector_checks_liveness_through_key_indexes(app, user_ids, statements):
+    db.session.add_all(
+        StorageTombstone(s3_key=f"seed/{user_ids[0]}/{n}", next_attempt_at=datetime.now(timezone.utc))
+        for n in range(5)
+    )
+    db.session.commit()
+    statements.clear()
+    assert collect_garbage()['skipped'] == 5
+    plans = query_plans(statements)
+    assert_uses_index(plans, 'ix_file_s3_key')
+    assert_uses_index(plans, 'ix_blob_s3_key')
@@ -0,0 +1,20 @@
+# backend/tests/test_ratelimit.py
+from app.ratelimit import MemoryRateLimiter
+
+
+def test_bucket_throttles_and_reports_retry_after():
+    limiter = MemoryRateLimiter()
+    assert [limiter.hit('login:1.2.3.4', 2, 1 / 60)[0] for _ in range(3)] == [True, True, False]
+    allowed, retry_after = limiter.hit('login:1.2.3.4', 2, 1 / 60)
+    assert not allowed and 59 < retry_after <= 60
+
+
+def test_table_is_bounded_by_evicting_least_recently_hit():
+    limiter = MemoryRateLimiter(max_keys=3)
+    limiter.hit('throttled', 1, 1 / 60)
+    for n in range(1000):
+        limiter.hit(f"flood:{n}", 1, 1 / 60)
+        # A key that keeps being hit stays throttled however many others come and go
+        assert not limiter.hit('throttled', 1, 1 / 60)[0]
+    assert len(limiter._buckets) == 3
+    assert 'flood:0' not in limiter._buckets
@@ -0,0 +1,33 @@
+# backend/tests/test_statement_counts.py
+#
+# The file listings load every relationship their serializers touch up front, so the
+# number of SQL statements per request must not grow with the files, shares or users involved.
+import pytest
+from app import db
+from conftest import auth_headers, seed
+
+
+def count_statements(client, statements, path, user_id):
+    headers = auth_headers(user_id)
+    # Warm the JWT user cache so only the listing itself is counted
+    client.get('/api/user', headers=headers)
+    statements.clear()
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('path', [
+    '/api/files',
+    '/api/files?fields=id,filename,shared_with_users',
+    '/api/files/owned',
+    '/api/files/shared',
+])
+def test_listing_statement_count_is_constant(client, statements, path):
+    counts = []
+    for users, files_per_user, shares_per_file in ((3, 1, 1), (30, 40, 10)):
+        db.drop_all()
+        db.create_all()
+        user_ids = seed(users, files_per_user, shares_per_file)
+        counts.append(count_statements(client, statements, path, user_ids[0]))
+    assert counts[0] == counts[1], f"{path}: {counts[0]} statements with a few rows, {counts[1]} with many"
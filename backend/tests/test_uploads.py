@@ -0,0 +1,33 @@
+# backend/tests/test_uploads.py
+import pytest
+from app import db
+from app.models import User
+from conftest import auth_headers
+
+
+@pytest.fixture
+def user_id(app):
+    user = User(username='alice', email='alice@test.local', password_hash='-')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+@pytest.mark.parametrize('body', [
+    {'filename': 'a.bin', 'size': True}, {'filename': 'a.bin', 'size': False}, {'filename': 'a.bin', 'size': '10'},
+    {'filename': 'a.bin', 'size': 1.5}, {'filename': 'a.bin', 'size': -1}, {'filename': ['a.bin'], 'size': 10},
+    {'size': 10},
+])
+def test_initiate_rejects_invalid_filename_or_size(client, user_id, body):
+    response = client.post('/api/upload/initiate', headers=auth_headers(user_id), json=body)
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'Missing filename or size'
+
+
+@pytest.mark.parametrize('size', [0, 10])
+def test_initiate_accepts_integer_size(client, user_id, size):
+    # The test app stores files locally, which takes no direct uploads
+    response = client.post('/api/upload/initiate', headers=auth_headers(user_id), json={
+        'filename': 'a.bin', 'size': size
+    })
+    assert response.status_code == 501
@@ -40,6 +40,11 @@ function ContextMenu({ x, y, file, isOwner, onDownload, onShare, onDelete, onLea
             Delete
           </div>
         </>
+      ) : file.via_group ? (
+        // Access through a group ends by leaving the group, not the file
+        <div style={{ padding: '6px 12px', color: '#888' }}>
+          Shared via group {file.group.name}
+        </div>
       ) : (
         // Otherwise, show "Leave collaboration"
         <div onClick={onLeave} style={{ padding: '6px 12px', cursor: 'pointer', color: 'red' }}>
@@ -9,11 +9,14 @@ import UsersModal from './UsersModal';
 import {API_BASE_URL} from '../config';
 import '../App.css';
 
+const FILES_PAGE_SIZE = 50;
+
 function Dashboard() {
     const navigate = useNavigate();
     const token = localStorage.getItem('access_token');
 
     const [files, setFiles] = useState({owned_files: [], shared_files: []});
+    const [nextCursors, setNextCursors] = useState({owned: null, shared: null});
     const [shareModalFile, setShareModalFile] = useState(null);
     const [contextMenu, setContextMenu] = useState(null);
     const [username, setUsername] = useState('');
@@ -34,14 +37,39 @@ function Dashboard() {
         }
     };
 
+    // Fetch one page of the 'owned' or 'shared' listing; cursor is null for the first page.
+    const fetchFilePage = async (stream, cursor) => {
+        const params = new URLSearchParams({limit: FILES_PAGE_SIZE});
+        if (cursor) params.set('cursor', cursor);
+        const res = await fetch(`${API_BASE_URL}/files/${stream}?${params}`, {
+            headers: {'Authorization': `Bearer ${token}`},
+        });
+        const data = await res.json();
+        return res.ok ? data : null;
+    };
+
     const fetchFiles = async () => {
         try {
-            const res = await fetch(`${API_BASE_URL}/files`, {
-                headers: {'Authorization': `Bearer ${token}`},
-            });
-            const data = await res.json();
-            if (res.ok) {
-                setFiles(data);
+            const [owned, shared] = await Promise.all([
+                fetchFilePage('owned', null),
+                fetchFilePage('shared', null),
+            ]);
+            if (owned && shared) {
+                setFiles({owned_files: owned.files, shared_files: shared.files});
+                setNextCursors({owned: owned.next_cursor, shared: shared.next_cursor});
+            }
+        } catch (err) {
+            console.error('Error fetching files:', err);
+        }
+    };
+
+    const loadMoreFiles = async (stream) => {
+        try {
+            const page = await fetchFilePage(stream, nextCursors[stream]);
+            if (page) {
+                const key = `${stream}_files`;
+                setFiles(prev => ({...prev, [key]: [...prev[key], ...page.files]}));
+                setNextCursors(prev => ({...prev, [stream]: page.next_cursor}));
             }
         } catch (err) {
             console.error('Error fetching files:', err);
@@ -154,32 +182,34 @@ function Dashboard() {
         // Start failedEmails with those that failed our initial basic format check.
         const failedEmails = [...invalidFormatEmails];
 
-        for (const email of validEmails) {
+        if (validEmails.length > 0) {
             try {
-                const res = await fetch(`${API_BASE_URL}/share`, {
+                const res = await fetch(`${API_BASE_URL}/share/bulk`, {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
                         'Authorization': `Bearer ${localStorage.getItem('access_token')}`
                     },
-                    body: JSON.stringify({file_id: file.id, recipient_email: email})
+                    body: JSON.stringify({file_ids: [file.id], recipient_emails: validEmails})
                 });
                 const data = await res.json();
                 if (res.ok) {
-                    // If the share is successful, record the returned username (or fallback to the email).
-                    successfulUsernames.push(data.shared_username || email);
+                    data.results.forEach(result => {
+                        const name = result.shared_username || result.recipient_email;
+                        if (result.status === 'shared') {
+                            successfulUsernames.push(name);
+                        } else if (result.status === 'already_shared') {
+                            alreadyHasAccessUsernames.push(name);
+                        } else {
+                            failedEmails.push(result.recipient_email);
+                        }
+                    });
                 } else {
-                    // Check if the error signals that the recipient already has access.
-                    if (data.msg === "The recipient already has access to this file") {
-                        alreadyHasAccessUsernames.push(data.shared_username || email);
-                    } else {
-                        // For any other error, add the email to the failed list.
-                        failedEmails.push(email);
-                    }
+                    failedEmails.push(...validEmails);
                 }
             } catch (error) {
-                console.error('Error sharing with', email, error);
-                failedEmails.push(email);
+                console.error('Error sharing file:', error);
+                failedEmails.push(...validEmails);
             }
         }
 
@@ -237,6 +267,10 @@ function Dashboard() {
     };
 
     const handleLeave = async (file) => {
+        if (file.via_group) {
+            alert(`"${file.filename}" is shared via the group "${file.group.name}"; leave the group instead.`);
+            return;
+        }
         if (!window.confirm(`Are you sure you want to leave collaboration for "${file.filename}"?`)) return;
         try {
             const res = await fetch(`${API_BASE_URL}/files/${file.id}/leave`, {
@@ -325,6 +359,11 @@ function Dashboard() {
                             </div>
                         ))}
                     </div>
+                    {nextCursors.owned && (
+                        <button className="load-more" onClick={() => loadMoreFiles('owned')}>
+                            Load more
+                        </button>
+                    )}
                 </section>
 
                 <section className="file-section">
@@ -364,6 +403,11 @@ function Dashboard() {
                                 <p>
                                     <strong>Shared by:</strong> {file.shared_by}
                                 </p>
+                                {file.via_group && (
+                                    <p>
+                                        <strong>Via group:</strong> {file.group.name}
+                                    </p>
+                                )}
                                 <p>
                                     <strong>Shared on:</strong>{' '}
                                     {new Date(file.shared_at).toLocaleString('en-US', {
@@ -374,6 +418,11 @@ function Dashboard() {
                             </div>
                         ))}
                     </div>
+                    {nextCursors.shared && (
+                        <button className="load-more" onClick={() => loadMoreFiles('shared')}>
+                            Load more
+                        </button>
+                    )}
                 </section>
             </div>
 
@@ -4,6 +4,9 @@
 import React, {useState} from 'react';
 import {API_BASE_URL} from '../config';
 
+const PART_CONCURRENCY = 4;
+const PART_RETRIES = 3;
+
 function FileUpload({onUploadComplete}) {
     const [selectedFile, setSelectedFile] = useState(null);
     const [message, setMessage] = useState('');
@@ -31,22 +34,122 @@ function FileUpload({onUploadComplete}) {
         return list.slice(0, list.length - 1).join(", ") + ", and " + list[list.length - 1];
     };
 
-    const handlePost = async () => {
-        if (!selectedFile) return;
-
+    // Legacy path: the file is sent through the API server.
+    const uploadViaServer = async (file) => {
         const formData = new FormData();
-        formData.append('file', selectedFile);
+        formData.append('file', file);
+        const res = await fetch(`${API_BASE_URL}/upload`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+            },
+            body: formData,
+        });
+        return {ok: res.ok, data: await res.json()};
+    };
 
-        try {
-            const uploadRes = await fetch(`${API_BASE_URL}/upload`, {
+    // Multipart sessions are remembered per file so a dropped upload can resume
+    // from the parts S3 already has.
+    const sessionKey = (file) => `upload-session:${file.name}:${file.size}:${file.lastModified}`;
+
+    const uploadParts = async (file, init) => {
+        const queue = [...init.parts];
+        const worker = async () => {
+            while (queue.length > 0) {
+                const part = queue.shift();
+                const start = (part.part_number - 1) * init.part_size;
+                let attempt = 0;
+                for (;;) {
+                    try {
+                        const s3Res = await fetch(part.url, {
+                            method: 'PUT',
+                            body: file.slice(start, start + init.part_size)
+                        });
+                        if (!s3Res.ok) throw new Error(`S3 part upload failed with status ${s3Res.status}`);
+                        break;
+                    } catch (err) {
+                        attempt += 1;
+                        if (attempt >= PART_RETRIES) throw err;
+                    }
+                }
+            }
+        };
+        await Promise.all(Array.from({length: PART_CONCURRENCY}, worker));
+    };
+
+    // Send the bytes straight to S3 using the presigned POST / multipart part URLs
+    // from upload-initiate, then register the file with upload-complete.
+    const uploadFile = async (file) => {
+        const authHeaders = {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+        };
+
+        let init = null;
+        const savedSessionId = localStorage.getItem(sessionKey(file));
+        if (savedSessionId) {
+            const resumeRes = await fetch(`${API_BASE_URL}/upload/sessions/${savedSessionId}`, {
+                headers: authHeaders
+            });
+            if (resumeRes.ok) {
+                init = await resumeRes.json();
+            } else {
+                localStorage.removeItem(sessionKey(file));
+            }
+        }
+        if (!init) {
+            const initRes = await fetch(`${API_BASE_URL}/upload/initiate`, {
                 method: 'POST',
-                headers: {
-                    'Authorization': `Bearer ${localStorage.getItem('access_token')}`
-                },
-                body: formData,
+                headers: authHeaders,
+                body: JSON.stringify({filename: file.name, size: file.size})
             });
-            const uploadData = await uploadRes.json();
-            if (!uploadRes.ok) {
+            if (!initRes.ok) {
+                return uploadViaServer(file);
+            }
+            init = await initRes.json();
+        }
+
+        const completeBody = {s3_key: init.s3_key, filename: file.name};
+        if (init.upload_type === 'post') {
+            try {
+                const formData = new FormData();
+                Object.entries(init.fields).forEach(([key, value]) => formData.append(key, value));
+                formData.append('file', file);
+                const s3Res = await fetch(init.url, {method: 'POST', body: formData});
+                if (!s3Res.ok) throw new Error(`S3 upload failed with status ${s3Res.status}`);
+            } catch (err) {
+                console.error('Direct upload failed, falling back to server upload:', err);
+                return uploadViaServer(file);
+            }
+        } else {
+            localStorage.setItem(sessionKey(file), init.session_id);
+            try {
+                await uploadParts(file, init);
+            } catch (err) {
+                console.error('Multipart upload interrupted:', err);
+                return {ok: false, data: {msg: 'Upload interrupted. Choose the same file again to resume.'}};
+            }
+            // The server asks S3 for the uploaded parts, so no ETags need to be collected here
+            completeBody.upload_id = init.upload_id;
+        }
+
+        const completeRes = await fetch(`${API_BASE_URL}/upload/complete`, {
+            method: 'POST',
+            headers: authHeaders,
+            body: JSON.stringify(completeBody)
+        });
+        if (completeRes.ok) {
+            localStorage.removeItem(sessionKey(file));
+        }
+        return {ok: completeRes.ok, data: await completeRes.json()};
+    };
+
+    const handlePost = async () => {
+        if (!selectedFile) return;
+
+        try {
+            const {ok: uploadOk, data: uploadData} = await uploadFile(selectedFile);
+            if (!uploadOk) {
                 setMessage(uploadData.msg || 'Upload failed');
                 return;
             }
@@ -69,30 +172,34 @@ function FileUpload({onUploadComplete}) {
             const alreadyHasAccessUsernames = [];
             const failedEmails = [...invalidEmails];
 
-            for (const email of validEmails) {
+            if (validEmails.length > 0) {
                 try {
-                    const shareRes = await fetch(`${API_BASE_URL}/share`, {
+                    const shareRes = await fetch(`${API_BASE_URL}/share/bulk`, {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json',
                             'Authorization': `Bearer ${localStorage.getItem('access_token')}`
                         },
-                        body: JSON.stringify({file_id: fileId, recipient_email: email})
+                        body: JSON.stringify({file_ids: [fileId], recipient_emails: validEmails})
                     });
                     const shareData = await shareRes.json();
                     if (shareRes.ok) {
-                        successfulUsernames.push(shareData.shared_username || email);
+                        shareData.results.forEach(result => {
+                            const name = result.shared_username || result.recipient_email;
+                            if (result.status === 'shared') {
+                                successfulUsernames.push(name);
+                            } else if (result.status === 'already_shared') {
+                                alreadyHasAccessUsernames.push(name);
+                            } else {
+                                failedEmails.push(result.recipient_email);
+                            }
+                        });
                     } else {
-                        if (shareData.msg === "The recipient already has access to this file") {
-                            alreadyHasAccessUsernames.push(shareData.shared_username || email);
-                        } else {
-                            // Otherwise, mark as failure.
-                            failedEmails.push(email);
-                        }
+                        failedEmails.push(...validEmails);
                     }
                 } catch (err) {
-                    console.error('Error sharing with', email, err);
-                    failedEmails.push(email);
+                    console.error('Error sharing file:', err);
+                    failedEmails.push(...validEmails);
                 }
             }
 